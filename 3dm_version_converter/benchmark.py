@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+3DM Converter Benchmarks
+Timing harness for the conversion functions in converter.py.
+
+    python benchmark.py suite --output run.json      # synthetic fixtures x every target version
+    python benchmark.py compare base.json run.json   # flag slowdowns between two runs
+    python benchmark.py memory model.3dm             # temp-file vs in-memory conversion
+"""
+import json
+import multiprocessing
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+import rhino3dm
+
+import converter as conv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _time_disk(data, name, target_version):
+    """Round trip through temp files, as the service does for large uploads."""
+    start = time.perf_counter()
+    tmpdir = Path(tempfile.mkdtemp(prefix="3dm-bench-"))
+    try:
+        input_path = tmpdir / name
+        output_path = tmpdir / f"out_{name}"
+        input_path.write_bytes(data)
+        ok, err = conv.convert_file(input_path, output_path, target_version)
+        if not ok:
+            raise click.ClickException(f"{name}: {err}")
+        output_path.read_bytes()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return time.perf_counter() - start
+
+
+def _time_memory(data, name, target_version):
+    start = time.perf_counter()
+    output, err = conv.convert_bytes(data, target_version)
+    if output is None:
+        raise click.ClickException(f"{name}: {err}")
+    return time.perf_counter() - start
+
+
+def _summary(samples):
+    return {
+        "medianMs": round(statistics.median(samples) * 1000, 3),
+        "minMs": round(min(samples) * 1000, 3),
+        "maxMs": round(max(samples) * 1000, 3),
+    }
+
+
+def build_fixture(path, scale, blocks=False):
+    """Write a synthetic model whose object count grows linearly with ``scale``.
+
+    Every scale unit adds layers, NURBS curves, breps, dense meshes and (with
+    ``blocks``) block definitions and instances, so that the common table
+    types are all exercised. Blocks are off by default because adding them
+    crashes some rhino3dm builds; :func:`_make_fixture` tries them safely.
+    Returns the number of objects written.
+    """
+    model = rhino3dm.File3dm()
+
+    layers = []
+    for i in range(min(10 * scale, 200)):
+        layer = rhino3dm.Layer()
+        layer.Name = f"Layer {i:03d}"
+        layers.append(model.Layers.Add(layer))
+
+    def attributes(i):
+        attrs = rhino3dm.ObjectAttributes()
+        attrs.LayerIndex = layers[i % len(layers)]
+        return attrs
+
+    for i in range(20 * scale):
+        points = [rhino3dm.Point3d(i + j, (i * j) % 7, j % 3) for j in range(8)]
+        model.Objects.AddCurve(rhino3dm.Curve.CreateControlPointCurve(points, 3), attributes(i))
+
+    for i in range(5 * scale):
+        center = rhino3dm.Point3d(i * 3.0, 0, 0)
+        model.Objects.AddBrep(rhino3dm.Brep.CreateFromSphere(rhino3dm.Sphere(center, 1.0)), attributes(i))
+        cylinder = rhino3dm.Cylinder(rhino3dm.Circle(center, 0.5), 2.0)
+        model.Objects.AddBrep(rhino3dm.Brep.CreateFromCylinder(cylinder, True, True), attributes(i))
+
+    for i in range(2 * scale):
+        model.Objects.AddMesh(_grid_mesh(50, offset=i * 60.0), attributes(i))
+
+    for i in range(scale if blocks else 0):
+        outline = rhino3dm.NurbsCurve.CreateFromCircle(rhino3dm.Circle(2.0))
+        index = model.InstanceDefinitions.Add(
+            f"Block {i}", "", "", "", rhino3dm.Point3d(0, 0, 0),
+            (_grid_mesh(10), outline), (rhino3dm.ObjectAttributes(), rhino3dm.ObjectAttributes()),
+        )
+        block_id = model.InstanceDefinitions[index].Id
+        for j in range(10):
+            xform = rhino3dm.Transform.Translation(i * 25.0, j * 25.0, 10.0)
+            model.Objects.AddInstanceObject(rhino3dm.InstanceReference(block_id, xform), attributes(j))
+
+    model.Write(str(path), 0)
+    return len(model.Objects)
+
+
+def _grid_mesh(n, offset=0.0):
+    mesh = rhino3dm.Mesh()
+    for y in range(n + 1):
+        for x in range(n + 1):
+            mesh.Vertices.Add(offset + x, y, (x * y) % 5 * 0.1)
+    for y in range(n):
+        for x in range(n):
+            a = y * (n + 1) + x
+            mesh.Faces.AddFace(a, a + 1, a + n + 2, a + n + 1)
+    return mesh
+
+
+def _run_isolated(fn, *args):
+    """Run ``fn(*args)`` in a fresh spawned process and return its result.
+
+    A fresh process keeps peak RSS figures independent and turns a crash in
+    native code into an exception instead of taking the benchmark down.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_isolated_main, args=(sender, fn, args))
+    proc.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    proc.join()
+    if result is None:
+        raise RuntimeError(f"worker process died (exit code {proc.exitcode})")
+    return result
+
+
+def _isolated_main(conn, fn, args):
+    conn.send(fn(*args))
+    conn.close()
+
+
+def _make_fixture(path, scale):
+    """Build a fixture in a child process, falling back to one without blocks.
+
+    ``InstanceDefinitions.Add`` segfaults in some rhino3dm builds (8.6.0 on
+    Linux among them); the fallback keeps the suite usable there.
+    """
+    try:
+        return _run_isolated(build_fixture, str(path), scale, True), True
+    except RuntimeError:
+        return _run_isolated(build_fixture, str(path), scale, False), False
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _measure(input_path, target_version, repeat):
+    """Runs in a fresh worker process so peak RSS belongs to this conversion alone."""
+    baseline = _peak_rss_mb()
+    output_path = Path(tempfile.mkdtemp(prefix="3dm-bench-")) / "out.3dm"
+    samples = []
+    error = ""
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ok, error = conv.convert_file(Path(input_path), output_path, target_version, overwrite=True)
+            samples.append(time.perf_counter() - start)
+            if not ok:
+                break
+        output_bytes = output_path.stat().st_size if output_path.exists() else None
+    finally:
+        shutil.rmtree(output_path.parent, ignore_errors=True)
+    return {
+        "ok": not error,
+        "error": error or None,
+        "wallSeconds": round(statistics.median(samples), 4),
+        "peakRssMb": _peak_rss_mb(),
+        "baselineRssMb": baseline,
+        "outputBytes": output_bytes,
+    }
+
+
+@click.group()
+def cli():
+    """Benchmark 3DM conversions."""
+
+
+@cli.command()
+@click.option('--scales', default='1,4,16,64', show_default=True,
+              help='Comma-separated fixture sizes; objects grow linearly with scale')
+@click.option('--versions', default=','.join(conv.RHINO_VERSIONS), show_default=True,
+              help='Comma-separated target Rhino versions')
+@click.option('--repeat', '-n', default=3, type=click.IntRange(min=1), help='Runs per fixture and version (median is reported)')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write JSON here instead of stdout')
+@click.option('--keep-fixtures', type=click.Path(file_okay=False), help='Keep generated fixtures in this directory')
+def suite(scales, versions, repeat, output, keep_fixtures):
+    """Convert synthetic fixtures to every target version and report JSON."""
+    scales = [int(s) for s in scales.split(',') if s.strip()]
+    versions = [v.strip() for v in versions.split(',') if v.strip()]
+    fixture_dir = Path(keep_fixtures) if keep_fixtures else Path(tempfile.mkdtemp(prefix="3dm-fixtures-"))
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    try:
+        for scale in scales:
+            fixture = fixture_dir / f"fixture_x{scale}.3dm"
+            objects, blocks = _make_fixture(fixture, scale)
+            size = fixture.stat().st_size
+            click.echo(
+                f"fixture x{scale}: {objects} objects, {size / 1e6:.2f} MB"
+                + ("" if blocks else " (no blocks: rhino3dm crashed adding instance definitions)"),
+                err=True,
+            )
+            for version in versions:
+                target_version = conv.get_version_number(version)
+                try:
+                    result = _run_isolated(_measure, str(fixture), target_version, repeat)
+                except RuntimeError as e:
+                    result = {"ok": False, "error": str(e), "wallSeconds": None, "peakRssMb": None,
+                              "baselineRssMb": None, "outputBytes": None}
+                wall = result["wallSeconds"]
+                results.append({
+                    "fixture": fixture.name,
+                    "scale": scale,
+                    "objects": objects,
+                    "blocks": blocks,
+                    "inputBytes": size,
+                    "version": version,
+                    "targetVersion": target_version,
+                    **result,
+                    "throughputMBps": round(size / 1e6 / wall, 2) if result["ok"] and wall else None,
+                })
+                click.echo(f"  -> Rhino {version}: " + (f"{wall:.3f}s" if result["ok"] else result["error"]), err=True)
+    finally:
+        if not keep_fixtures:
+            shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "rhino3dm": getattr(rhino3dm, "__version__", "unknown"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text)
+    else:
+        click.echo(text)
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=0.10, show_default=True, help='Relative slowdown reported as a regression')
+def compare(baseline, current, threshold):
+    """Compare two suite reports; exits 1 if any case slowed down past the threshold."""
+    def load(path):
+        report = json.loads(Path(path).read_text())
+        return report["meta"], {(r["scale"], r["version"]): r for r in report["results"]}
+
+    base_meta, base = load(baseline)
+    cur_meta, cur = load(current)
+    click.echo(f"rhino3dm {base_meta['rhino3dm']} -> {cur_meta['rhino3dm']}")
+
+    regressions = 0
+    for case in sorted(set(base) & set(cur)):
+        before, after = base[case], cur[case]
+        if not (before["ok"] and after["ok"]):
+            click.echo(f"x{case[0]:<4} Rhino {case[1]}: ok {before['ok']} -> {after['ok']}")
+            regressions += before["ok"] and not after["ok"]
+            continue
+        change = after["wallSeconds"] / before["wallSeconds"] - 1 if before["wallSeconds"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        click.echo(
+            f"x{case[0]:<4} Rhino {case[1]}: {before['wallSeconds']:.3f}s -> {after['wallSeconds']:.3f}s "
+            f"({change:+.1%}), peak RSS {before['peakRssMb']} -> {after['peakRssMb']} MB{flag}"
+        )
+    sys.exit(1 if regressions else 0)
+
+
+@cli.command()
+@click.argument('input_paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--version', '-v', default='7',
+              type=click.Choice(list(conv.RHINO_VERSIONS.keys()), case_sensitive=False),
+              help='Target Rhino version')
+@click.option('--repeat', '-n', default=20, type=click.IntRange(min=1), help='Runs per file and mode')
+def memory(input_paths, version, repeat):
+    """Compare temp-file conversion with in-memory convert_bytes."""
+    target_version = conv.get_version_number(version)
+    results = []
+    for path in map(Path, input_paths):
+        data = path.read_bytes()
+        # Warm up rhino3dm and the page cache before timing
+        _time_memory(data, path.name, target_version)
+        disk = [_time_disk(data, path.name, target_version) for _ in range(repeat)]
+        mem = [_time_memory(data, path.name, target_version) for _ in range(repeat)]
+        disk_ms = statistics.median(disk) * 1000
+        mem_ms = statistics.median(mem) * 1000
+        results.append({
+            "file": str(path),
+            "bytes": len(data),
+            "targetVersion": target_version,
+            "disk": _summary(disk),
+            "memory": _summary(mem),
+            "deltaMs": round(disk_ms - mem_ms, 3),
+            "speedup": round(disk_ms / mem_ms, 3) if mem_ms else None,
+        })
+    click.echo(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    cli()
@@ -3,12 +3,22 @@
 3DM File Version Converter
 A utility to convert Rhino 3DM files between different versions.
 """
+import hashlib
+import json
 import os
+import re
+import shutil
 import sys
+import tempfile
+import time
 import click
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, CancelledError, as_completed, wait
+from fnmatch import fnmatch
 from pathlib import Path
 from tqdm import tqdm
 import rhino3dm
+from workers import ConversionTimeout, WorkerPool
 
 # Supported Rhino versions and their corresponding file versions
 RHINO_VERSIONS = {
@@ -21,92 +31,732 @@ RHINO_VERSIONS = {
     '8': 8
 }
 
+# Written to the output directory by incremental runs (--incremental)
+MANIFEST_NAME = '.3dm-converter-manifest.json'
+
+# Every 3DM file starts with this 24-byte signature and an 8-digit archive version
+_HEADER_MAGIC = b'3D Geometry File Format '
+_TCODE_COMMENTBLOCK = 0x00000001
+# Enough of the file start for the header and the comment block after it
+PROBE_BYTES = 64 * 1024
+
+# How directory discovery treats symbolic links (see FileDiscovery)
+SYMLINK_POLICIES = ('skip', 'files', 'follow')
+
+def _may_overwrite(overwrite, target_version):
+    """``overwrite`` is a bool, or the target versions whose outputs may be replaced."""
+    if isinstance(overwrite, bool):
+        return overwrite
+    return target_version in overwrite
+
 def get_version_number(version_str):
     """Convert version string to corresponding file version number."""
     version_str = str(version_str).lower().replace('rhino', '').strip()
     return RHINO_VERSIONS.get(version_str, RHINO_VERSIONS['7'])  # Default to Rhino 7 if version not found
 
-def convert_file(input_path, output_path, target_version, overwrite=False):
-    """Convert a single 3DM file to the target version."""
+def convert_file(input_path, output_path, target_version, overwrite=False, timings=None):
+    """Convert a single 3DM file to the target version.
+
+    If ``timings`` is a dict, the read and write durations in seconds are
+    stored in it under ``'read'`` and ``'write'``.
+    """
     try:
         # Respect overwrite flag
         if output_path.exists() and not overwrite:
             return False, f"Output exists and --overwrite not set: {output_path}"
 
         # Read the file
+        start = time.perf_counter()
         model = rhino3dm.File3dm.Read(str(input_path))
+        read_done = time.perf_counter()
         
         # Write to the target version
         model.Write(str(output_path), target_version)
+        if timings is not None:
+            timings['read'] = read_done - start
+            timings['write'] = time.perf_counter() - read_done
         return True, ""
     except Exception as e:
         return False, str(e)
 
-def process_files(input_paths, output_dir, target_version, recursive=False, overwrite=False):
-    """Process multiple 3DM files."""
+def convert_file_timed(input_path, output_path, target_version, overwrite=False):
+    """Run :func:`convert_file` and return ``(success, error, timings)``.
+
+    For callers running the conversion in another process, where a
+    ``timings`` dict passed in would not come back.
+    """
+    timings = {}
+    success, error = convert_file(input_path, output_path, target_version, overwrite, timings)
+    return success, error, timings
+
+def convert_file_multi(input_path, outputs, overwrite=False, timings=None):
+    """Convert a single 3DM file to several versions, reading it only once.
+
+    ``outputs`` maps each target version to its output path. Returns a dict
+    mapping each target version to ``(success, error)``. ``overwrite`` may be
+    the set of target versions whose existing outputs may be replaced.
+    ``timings`` works as in :func:`convert_file`; ``'write'`` covers all
+    targets together.
+    """
+    results = {}
+    pending = {}
+    for target_version, output_path in outputs.items():
+        if output_path.exists() and not _may_overwrite(overwrite, target_version):
+            results[target_version] = (False, f"Output exists and --overwrite not set: {output_path}")
+        else:
+            pending[target_version] = output_path
+    if not pending:
+        return results
+
+    try:
+        start = time.perf_counter()
+        model = rhino3dm.File3dm.Read(str(input_path))
+        if model is None:
+            raise ValueError("Could not read 3DM file")
+        read_done = time.perf_counter()
+    except Exception as e:
+        results.update((target_version, (False, str(e))) for target_version in pending)
+        return results
+
+    # Every target is written from the same parsed model
+    for target_version, output_path in pending.items():
+        try:
+            if model.Write(str(output_path), target_version):
+                results[target_version] = (True, "")
+            else:
+                results[target_version] = (False, "rhino3dm failed to write the model")
+        except Exception as e:
+            results[target_version] = (False, str(e))
+    if timings is not None:
+        timings['read'] = read_done - start
+        timings['write'] = time.perf_counter() - read_done
+    return results
+
+def convert_bytes(data, target_version, timings=None):
+    """Convert an in-memory 3DM file and return ``(output_bytes, error)``.
+
+    The model is parsed straight from ``data``. rhino3dm can only write to a
+    path, so the output goes to an anonymous in-memory file (memfd) on Linux
+    and to a temporary file elsewhere. On failure ``output_bytes`` is None.
+    ``timings`` works as in :func:`convert_file`.
+    """
+    try:
+        start = time.perf_counter()
+        model = rhino3dm.File3dm.FromByteArray(data)
+        if model is None:
+            return None, "Could not read 3DM data"
+        read_done = time.perf_counter()
+        output = _write_bytes(model, target_version)
+        if timings is not None:
+            timings['read'] = read_done - start
+            timings['write'] = time.perf_counter() - read_done
+        return output, ""
+    except Exception as e:
+        return None, str(e)
+
+def _write_bytes(model, target_version):
+    """Write ``model`` at ``target_version`` and return the file contents."""
+    if hasattr(os, 'memfd_create') and os.path.isdir('/proc/self/fd'):
+        fd = os.memfd_create('3dm-output')
+        with open(fd, 'rb') as f:
+            if not model.Write(f'/proc/self/fd/{fd}', target_version):
+                raise RuntimeError("rhino3dm failed to write the model")
+            return f.read()
+
+    # Prefer tmpfs where it exists so the round trip stays in RAM
+    shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    fd, path = tempfile.mkstemp(suffix='.3dm', dir=shm)
+    os.close(fd)
+    try:
+        if not model.Write(path, target_version):
+            raise RuntimeError("rhino3dm failed to write the model")
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+def probe_bytes(data):
+    """Read the version information from the first bytes of a 3DM file.
+
+    Only the 32-byte header and the comment block that follows it are
+    looked at; pass at least :data:`PROBE_BYTES` bytes to be sure the whole
+    comment is included. Returns None if ``data`` is not a 3DM file, else a
+    dict with:
+
+    - ``archive_version``: the version stored in the header (1-4, 50, 60, ...)
+    - ``version``: the matching file version as used for ``target_version`` (1-8)
+    - ``opennurbs_version``: the version of the OpenNURBS toolkit that wrote
+      the file, when the comment block names it
+    - ``saved_by``: the Rhino major version of that toolkit, for files written
+      by Rhino 6 and later (older toolkits use date-based numbers)
+    """
+    if len(data) < 32 or not data.startswith(_HEADER_MAGIC):
+        return None
+    try:
+        archive_version = int(data[24:32].decode('ascii').strip())
+    except (UnicodeDecodeError, ValueError):
+        return None
+    info = {
+        'archive_version': archive_version,
+        'version': archive_version // 10 if archive_version >= 10 else archive_version,
+        'opennurbs_version': None,
+        'saved_by': None,
+    }
+
+    # The header is followed by a TCODE_COMMENTBLOCK chunk: 4-byte typecode, then
+    # a length that is 4 bytes wide before version 5 and 8 bytes from then on
+    length_size = 8 if archive_version >= 50 else 4
+    if len(data) >= 36 + length_size and int.from_bytes(data[32:36], 'little') == _TCODE_COMMENTBLOCK:
+        length = int.from_bytes(data[36:36 + length_size], 'little')
+        comment = data[36 + length_size:36 + length_size + length].decode('latin-1')
+        match = re.search(r'OpenNURBS toolkit version (\d+)', comment)
+        if match:
+            toolkit = int(match.group(1))
+            info['opennurbs_version'] = toolkit
+            # Newer toolkits set the high bit and store the major version in bits 25-30
+            if toolkit & 0x80000000:
+                info['saved_by'] = (toolkit >> 25) & 0x3F
+    return info
+
+def probe_file(path):
+    """Return :func:`probe_bytes` for the start of the file at ``path``, or None if it can't be read."""
+    try:
+        with open(path, 'rb') as f:
+            return probe_bytes(f.read(PROBE_BYTES))
+    except OSError:
+        return None
+
+def copy_through(input_path, outputs, overwrite=False, info=None):
+    """Copy ``input_path`` unchanged to the outputs whose version it already meets.
+
+    ``outputs`` maps target version -> output path. A file that is already
+    at or below a target version gains nothing from being re-written by
+    rhino3dm, so it is copied instead. The header is probed unless ``info``
+    (from :func:`probe_file`) is given. ``overwrite`` works as in
+    :func:`convert_file_multi`. Returns ``(results, remaining)``:
+    ``(success, error)`` per copied version, and the outputs that still need
+    converting.
+    """
+    info = info or probe_file(input_path)
+    if info is None:
+        return {}, dict(outputs)
+    results = {}
+    remaining = {}
+    for target_version, output_path in outputs.items():
+        if info['version'] > target_version:
+            remaining[target_version] = output_path
+        elif output_path.exists() and not _may_overwrite(overwrite, target_version):
+            results[target_version] = (False, f"Output exists and --overwrite not set: {output_path}")
+        else:
+            try:
+                shutil.copyfile(input_path, output_path)
+                results[target_version] = (True, "")
+            except OSError as e:
+                results[target_version] = (False, str(e))
+    return results, remaining
+
+class FileDiscovery:
+    """Lazily find 3DM files under the given paths with ``os.scandir``.
+
+    Iterating yields each matching file as soon as its directory has been
+    read, so conversions can start long before a large tree is fully walked.
+    Paths given as files are yielded unchanged. Directory entries are
+    matched against the ``include`` and ``exclude`` glob patterns: patterns
+    containing ``/`` match the path relative to the input directory, others
+    match the file name, and excluded directories are not entered.
+    ``symlinks`` is ``'skip'`` (ignore links), ``'files'`` (follow links to
+    files only, the default) or ``'follow'`` (also enter linked directories,
+    visiting each real directory once).
+
+    While iterating, :attr:`estimated_total` extrapolates the number of
+    matches from the directories read so far; it is exact once :attr:`done`
+    is set. Unreadable directories are listed in :attr:`errors`.
+    """
+
+    def __init__(self, paths, recursive=False, include=('*.3dm',), exclude=(), symlinks='files'):
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"symlinks must be one of {', '.join(SYMLINK_POLICIES)}")
+        self.paths = [Path(p) for p in paths]
+        self.recursive = recursive
+        self.include = tuple(include) or ('*.3dm',)
+        self.exclude = tuple(exclude)
+        self.symlinks = symlinks
+        self.found = 0
+        self.dirs_scanned = 0
+        self.dirs_pending = 0
+        self.done = False
+        self.errors = []
+
+    @property
+    def estimated_total(self):
+        if self.done or not self.dirs_scanned:
+            return self.found
+        return self.found + round(self.found / self.dirs_scanned * self.dirs_pending)
+
+    def __iter__(self):
+        for path in self.paths:
+            if path.is_dir():
+                yield from self._walk(path)
+            else:
+                self.found += 1
+                yield path
+        self.done = True
+
+    @staticmethod
+    def _matches(patterns, name, rel):
+        return any(fnmatch(rel if '/' in pattern else name, pattern) for pattern in patterns)
+
+    def _walk(self, root):
+        visited = set()
+        if self.symlinks == 'follow':
+            st = root.stat()
+            visited.add((st.st_dev, st.st_ino))
+        stack = [(root, '')]
+        self.dirs_pending += 1
+        while stack:
+            directory, rel_dir = stack.pop()
+            self.dirs_pending -= 1
+            files = []
+            subdirs = []
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                self.errors.append(f"Cannot read {directory}: {e}")
+                continue
+            for entry in entries:
+                rel = rel_dir + entry.name
+                try:
+                    if self.symlinks == 'skip' and entry.is_symlink():
+                        continue
+                    if entry.is_dir(follow_symlinks=self.symlinks == 'follow'):
+                        if not self.recursive or self._matches(self.exclude, entry.name, rel):
+                            continue
+                        if self.symlinks == 'follow':
+                            st = entry.stat()
+                            if (st.st_dev, st.st_ino) in visited:
+                                continue
+                            visited.add((st.st_dev, st.st_ino))
+                        subdirs.append((Path(entry.path), rel + '/'))
+                    elif (entry.is_file() and self._matches(self.include, entry.name, rel)
+                          and not self._matches(self.exclude, entry.name, rel)):
+                        files.append(Path(entry.path))
+                except OSError:
+                    # Vanished or unreadable entry (e.g. a broken link)
+                    continue
+            # Depth first, in name order
+            stack.extend(reversed(subdirs))
+            self.dirs_pending += len(subdirs)
+            self.dirs_scanned += 1
+            self.found += len(files)
+            yield from files
+
+def process_files(input_paths, output_dir, target_version, recursive=False, overwrite=False, jobs=1,
+                  incremental=False, dry_run=False, report=None,
+                  include=('*.3dm',), exclude=(), symlinks='files', copy_current=True, timeout=None):
+    """Process multiple 3DM files.
+
+    ``target_version`` may be a list of versions, in which case each file is
+    read once and written to every version, under a ``rhino<N>`` subdirectory
+    of ``output_dir`` per version. With ``jobs`` > 1 the conversions are
+    spread across that many worker processes; ``jobs`` of 0 uses one process
+    per CPU core. ``processed`` counts the output files written.
+
+    With ``timeout`` (seconds), a file still converting after that long has
+    its worker process killed and is reported as timed out; conversions then
+    always run in worker processes, even with ``jobs`` of 1.
+
+    Input directories are walked lazily by :class:`FileDiscovery` (see there
+    for ``include``, ``exclude`` and ``symlinks``): conversions start with
+    the first file found and the progress total is refined as scanning
+    proceeds.
+
+    With ``copy_current`` (the default), files already at or below a target
+    version are copied to the output instead of being converted; see
+    :func:`copy_through`.
+
+    With ``incremental`` a manifest in ``output_dir`` records each input's
+    size, mtime and hash and each output's hash, and inputs unchanged since
+    their last conversion are skipped. With ``dry_run`` nothing is written.
+    If ``report`` is a dict, ``'planned'`` is set to a list of
+    ``(input_path, output_path, reason)`` for each conversion to do,
+    ``'blocked'`` to ``(input_path, output_path)`` for each existing output
+    left alone for want of ``overwrite``, ``'skipped'`` to the number of up-to-date inputs and ``'copied'`` to the
+    number of outputs copied through and ``'timed_out'`` to the number of
+    inputs whose conversion was stopped by ``timeout``.
+    """
     input_paths = [Path(p) for p in input_paths]
+    output_dir = Path(output_dir)
+    target_versions = list(target_version) if isinstance(target_version, (list, tuple)) else [target_version]
     processed = 0
+    skipped = 0
+    copied = 0
+    timed_out = 0
+    planned = []
+    blocked = []
     errors = []
+    manifest = load_manifest(output_dir) if incremental else {}
+    discovery = FileDiscovery(input_paths, recursive, include, exclude, symlinks)
     
-    # Expand directories if recursive is True
-    all_inputs = []
-    for path in input_paths:
-        if path.is_dir():
-            if recursive:
-                all_inputs.extend(path.rglob('*.3dm'))
-            else:
-                all_inputs.extend(path.glob('*.3dm'))
-        else:
-            all_inputs.append(path)
-    
-    # Process each file
-    for input_path in tqdm(all_inputs, desc="Converting files"):
-        if input_path.suffix.lower() != '.3dm':
-            errors.append(f"Skipping non-3DM file: {input_path}")
-            continue
+    with tqdm(total=0, desc="Converting files") as progress:
+        def tasks():
+            """Turn discovered files into conversion tasks as they are found."""
+            nonlocal skipped
+            for input_path in discovery:
+                progress.total = discovery.estimated_total
+                progress.refresh()
+                if input_path.suffix.lower() != '.3dm':
+                    errors.append(f"Skipping non-3DM file: {input_path}")
+                    progress.update(1)
+                    continue
+                    
+                # Create output paths, one per target version
+                rel_path = input_path.relative_to(input_paths[0].parent) if len(input_paths) > 1 else input_path.name
+                outputs = {}
+                reasons = {}
+                # Outputs this input wrote on an earlier run, replaceable without --overwrite
+                owned = set()
+                blocked_before = len(blocked)
+                for version in target_versions:
+                    version_dir = output_dir if len(target_versions) == 1 else output_dir / f"rhino{version}"
+                    output_path = version_dir / rel_path
+                    reason = 'new'
+                    if incremental:
+                        record = manifest.get(_manifest_key(output_dir, output_path))
+                        if record is not None and record['input'] != str(input_path.resolve()):
+                            # Another input maps to the same output; treat it like any existing file
+                            record = None
+                        reason = _conversion_reason(record, input_path, output_path, version)
+                        if reason is None:
+                            continue
+                        if record is not None:
+                            owned.add(version)
+                    if reason == 'new' and output_path.exists():
+                        if overwrite:
+                            reason = 'overwrite'
+                        else:
+                            blocked.append((input_path, output_path))
+                            if dry_run:
+                                continue
+                            reason = 'exists, --overwrite not set'
+                    outputs[version] = output_path
+                    reasons[version] = reason
+                
+                if dry_run and outputs:
+                    info = probe_file(input_path) if copy_current else None
+                    for version, output_path in outputs.items():
+                        reason = reasons[version]
+                        if info and info['version'] <= version:
+                            reason += f", copy: already Rhino {info['version']}"
+                        planned.append((input_path, output_path, reason))
+                if not outputs or dry_run:
+                    # Inputs held back by existing outputs are not up to date
+                    skipped += not outputs and len(blocked) == blocked_before
+                    progress.update(1)
+                    continue
+                for output_path in outputs.values():
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                task_overwrite = overwrite
+                if incremental and not overwrite:
+                    task_overwrite = owned
+                yield input_path, outputs, task_overwrite
             
-        # Create output path
-        rel_path = input_path.relative_to(input_paths[0].parent) if len(input_paths) > 1 else input_path.name
-        output_path = Path(output_dir) / rel_path
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+            progress.total = discovery.estimated_total
+            progress.refresh()
         
-        # Convert the file
-        success, error = convert_file(input_path, output_path, target_version, overwrite=overwrite)
-        if success:
-            processed += 1
+        jobs = jobs or os.cpu_count() or 1
+        pool = None
+        if jobs <= 1 and not timeout:
+            results = (
+                (input_path, outputs, _convert_task(input_path, outputs, task_overwrite, incremental, copy_current))
+                for input_path, outputs, task_overwrite in tasks()
+            )
         else:
-            errors.append(f"Error converting {input_path}: {error}")
+            pool = WorkerPool(jobs, timeout)
+            results = convert_in_workers(tasks(), pool, incremental, copy_current)
+        
+        # Results may arrive out of order; the bar advances once per finished file
+        try:
+            for count, (input_path, outputs, (file_results, info)) in enumerate(results, 1):
+                copied += len(info.get('copied', ()))
+                if info.get('timedOut'):
+                    timed_out += 1
+                    errors.append(f"Timed out converting {input_path}: stopped after {timeout:g} s")
+                    progress.update(1)
+                    continue
+                for version, (success, error) in file_results.items():
+                    if success:
+                        processed += 1
+                        if 'sha256' in info:
+                            _record_conversion(manifest, output_dir, input_path, outputs[version], version, info)
+                    elif len(target_versions) == 1:
+                        errors.append(f"Error converting {input_path}: {error}")
+                    else:
+                        errors.append(f"Error converting {input_path} to Rhino {version}: {error}")
+                progress.update(1)
+                # Checkpoint now and then so an interrupted run keeps its progress
+                if incremental and count % 100 == 0:
+                    save_manifest(output_dir, manifest)
+        finally:
+            if pool is not None:
+                # Normally idle by now; on Ctrl-C this stops conversions still running
+                pool.shutdown(kill=True)
+            if incremental and not dry_run:
+                save_manifest(output_dir, manifest)
     
+    errors.extend(discovery.errors)
+    if report is not None:
+        report['planned'] = planned
+        report['blocked'] = blocked
+        report['skipped'] = skipped
+        report['copied'] = copied
+        report['timed_out'] = timed_out
     return processed, errors
 
+def _convert_task(input_path, outputs, overwrite, track=False, copy_current=False):
+    """Run :func:`convert_file_multi` for one input and return ``(results, info)``.
+
+    With ``copy_current``, outputs the file already meets are copied through
+    first and listed in ``info['copied']``. With ``track``, ``info`` also gets
+    the input's size, mtime and hash and each output's hash and size for the
+    incremental manifest; hashing here keeps it in the worker process.
+    ``info['seconds']`` is the time taken and ``info['timings']`` holds the
+    read and write durations when the file was converted.
+    """
+    started = time.perf_counter()
+    info = {}
+    stat = input_path.stat() if track else None
+    results = {}
+    if copy_current:
+        results, outputs_left = copy_through(input_path, outputs, overwrite)
+        info['copied'] = [version for version, (success, _) in results.items() if success]
+    else:
+        outputs_left = outputs
+    if outputs_left:
+        timings = {}
+        results.update(convert_file_multi(input_path, outputs_left, overwrite, timings))
+        if timings:
+            info['timings'] = timings
+    info['seconds'] = time.perf_counter() - started
+    if not track or not any(success for success, _ in results.values()):
+        return results, info
+    info.update({
+        'size': stat.st_size,
+        'mtimeNs': stat.st_mtime_ns,
+        'sha256': _file_sha256(input_path),
+        'outputs': {
+            version: (_file_sha256(outputs[version]), outputs[version].stat().st_size)
+            for version, (success, _) in results.items() if success
+        },
+    })
+    return results, info
+
+def convert_in_workers(tasks, pool, track=False, copy_current=False):
+    """Convert ``(input_path, outputs, overwrite)`` tasks in a :class:`WorkerPool`.
+
+    Yields ``(input_path, outputs, (results, info))`` as files finish, in
+    completion order, with ``results`` and ``info`` as from one call of
+    :func:`convert_file_multi` plus copy-through (see :func:`process_files`).
+    ``tasks`` may be a lazy iterator; only ``2 * pool.workers`` tasks are
+    submitted ahead of the results, so discovery keeps pace with the workers.
+    Tasks killed for running past the pool's timeout come back with
+    ``info['timedOut']``, tasks killed by ``pool.shutdown(kill=True)`` with
+    ``info['cancelled']``; their partial outputs are removed.
+    """
+    def collect(future):
+        input_path, outputs, replaceable = pending.pop(future)
+        try:
+            return input_path, outputs, future.result()
+        except Exception as e:
+            # A killed or crashed worker (e.g. out of memory) may leave partly written outputs
+            for version in replaceable:
+                outputs[version].unlink(missing_ok=True)
+            error = str(e)
+            info = {}
+            if isinstance(e, ConversionTimeout):
+                info['timedOut'] = True
+            elif isinstance(e, CancelledError):
+                info['cancelled'] = True
+                error = 'Cancelled'
+            return input_path, outputs, ({version: (False, error) for version in outputs}, info)
+
+    pending = {}
+    for input_path, outputs, overwrite in tasks:
+        replaceable = [
+            version for version, path in outputs.items() if _may_overwrite(overwrite, version) or not path.exists()
+        ]
+        future = pool.submit(_convert_task, input_path, outputs, overwrite, track, copy_current)
+        pending[future] = (input_path, outputs, replaceable)
+        if len(pending) >= 2 * pool.workers:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield collect(future)
+    for future in as_completed(list(pending)):
+        yield collect(future)
+
+def load_manifest(output_dir):
+    """Return the incremental manifest entries of ``output_dir``, keyed by output path."""
+    try:
+        with open(Path(output_dir) / MANIFEST_NAME, encoding='utf-8') as f:
+            return json.load(f).get('entries', {})
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(output_dir, entries):
+    """Atomically write the incremental manifest of ``output_dir``."""
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'entries': entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def _manifest_key(output_dir, output_path):
+    return output_path.relative_to(output_dir).as_posix()
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _conversion_reason(record, input_path, output_path, target_version):
+    """Return why ``input_path`` needs converting to ``output_path``, or None if up to date.
+
+    ``record`` is the manifest entry ``input_path`` wrote for this output, or None.
+    Size and mtime decide in the common case; the input is only hashed when
+    its mtime moved but its size did not, e.g. after a copy or ``touch``.
+    """
+    if record is None:
+        return 'new'
+    if record['targetVersion'] != target_version:
+        return 'changed'
+    try:
+        stat = input_path.stat()
+        output_size = output_path.stat().st_size
+    except FileNotFoundError:
+        return 'output missing'
+    if output_size != record['outputSize']:
+        return 'output changed'
+    if stat.st_size != record['size']:
+        return 'changed'
+    if stat.st_mtime_ns != record['mtimeNs']:
+        if _file_sha256(input_path) != record['sha256']:
+            return 'changed'
+        # Same content, new timestamp: remember it so the hash isn't redone next run
+        record['mtimeNs'] = stat.st_mtime_ns
+    return None
+
+def _record_conversion(manifest, output_dir, input_path, output_path, target_version, info):
+    output_sha256, output_size = info['outputs'][target_version]
+    manifest[_manifest_key(output_dir, output_path)] = {
+        'input': str(input_path.resolve()),
+        'size': info['size'],
+        'mtimeNs': info['mtimeNs'],
+        'sha256': info['sha256'],
+        'targetVersion': target_version,
+        'outputSha256': output_sha256,
+        'outputSize': output_size,
+    }
+
+def print_probe(paths):
+    """Print the header version of every file in ``paths`` and a count per version."""
+    counts = {}
+    for path in paths:
+        info = probe_file(path)
+        if info is None:
+            label = 'not a 3DM file'
+            click.echo(f"{path}: {label}")
+        else:
+            label = f"Rhino {info['version']}"
+            saved_by = f", saved with OpenNURBS {info['saved_by']}" if info['saved_by'] else ''
+            click.echo(f"{path}: {label} file (archive version {info['archive_version']}){saved_by}")
+        counts[label] = counts.get(label, 0) + 1
+    errors = getattr(paths, 'errors', [])
+    for error in errors:
+        click.echo(f"Error: {error}")
+    click.echo("\nSummary:")
+    for label, count in sorted(counts.items()):
+        click.echo(f"  {label}: {count} files")
+
 @click.command()
 @click.argument('input_paths', nargs=-1, type=click.Path(exists=True))
 @click.option('--output', '-o', default='output', help='Output directory', type=click.Path())
-@click.option('--version', '-v', default='7', 
+@click.option('--version', '-v', default=['7'], multiple=True,
               type=click.Choice(list(RHINO_VERSIONS.keys()), case_sensitive=False),
-              help='Target Rhino version')
+              help='Target Rhino version; repeat to write several versions from a single read')
 @click.option('--recursive', '-r', is_flag=True, help='Process directories recursively')
 @click.option('--overwrite', is_flag=True, help='Overwrite existing files')
-def main(input_paths, output, version, recursive, overwrite):
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=0),
+              help='Number of files to convert in parallel (0 = one per CPU core)')
+@click.option('--include', multiple=True, default=['*.3dm'], show_default=True,
+              help='Glob of files to convert in input folders; repeatable')
+@click.option('--exclude', multiple=True,
+              help='Glob of files or folders to leave out (e.g. "*_backup.3dm", "archive"); repeatable')
+@click.option('--symlinks', default='files', show_default=True, type=click.Choice(SYMLINK_POLICIES),
+              help='Symbolic links in input folders: skip them, follow links to files, or follow all')
+@click.option('--incremental', is_flag=True,
+              help=f'Only convert files changed since the last run (tracked in {MANIFEST_NAME})')
+@click.option('--dry-run', is_flag=True, help='List the files that would be converted without converting them')
+@click.option('--always-convert', is_flag=True,
+              help='Re-write files already at or below the target version instead of copying them')
+@click.option('--probe', is_flag=True, help='Only report the version of each file, read from its header')
+@click.option('--timeout', type=click.FloatRange(min=0), default=0,
+              help='Stop a file that takes longer than this many seconds to convert (0 = no limit)')
+def main(input_paths, output, version, recursive, overwrite, jobs, include, exclude, symlinks, incremental, dry_run,
+         always_convert, probe, timeout):
     """Convert Rhino 3DM files to a different version."""
     if not input_paths:
         click.echo("Error: No input files or directories specified.")
         sys.exit(1)
     
-    # Convert version string to number
-    target_version = get_version_number(version)
+    if probe:
+        print_probe(FileDiscovery(input_paths, recursive, include, exclude, symlinks))
+        return
+    
+    # Convert version strings to numbers, dropping repeats
+    versions = list(dict.fromkeys(version))
+    target_versions = [get_version_number(v) for v in versions]
     
     # Create output directory
     output_path = Path(output)
-    output_path.mkdir(parents=True, exist_ok=True)
+    if not dry_run:
+        output_path.mkdir(parents=True, exist_ok=True)
     
     # Process files
-    click.echo(f"Converting files to Rhino {version} format (file version {target_version})...")
-    processed, errors = process_files(input_paths, output_path, target_version, recursive, overwrite)
+    if len(target_versions) == 1:
+        click.echo(f"Converting files to Rhino {versions[0]} format (file version {target_versions[0]})...")
+        target_version = target_versions[0]
+    else:
+        click.echo(f"Converting files to Rhino {', '.join(versions)} formats (one rhino<N> folder per version)...")
+        target_version = target_versions
+    report = {}
+    processed, errors = process_files(input_paths, output_path, target_version, recursive, overwrite, jobs,
+                                      incremental=incremental, dry_run=dry_run, report=report,
+                                      include=include, exclude=exclude, symlinks=symlinks,
+                                      copy_current=not always_convert, timeout=timeout or None)
+    
+    if dry_run:
+        click.echo(f"\nWould write {len(report['planned'])} files:")
+        for input_path, planned_output, reason in report['planned']:
+            click.echo(f"  {input_path} -> {planned_output} ({reason})")
+        if report['blocked']:
+            click.echo(f"Would skip {len(report['blocked'])} files (output exists, --overwrite not set):")
+            for input_path, blocked_output in report['blocked']:
+                click.echo(f"  {input_path} -> {blocked_output}")
+        if incremental:
+            click.echo(f"Up to date: {report['skipped']} files")
+        return
     
     # Print summary
     click.echo("\nConversion complete!")
     click.echo(f"Successfully processed: {processed} files")
+    if report['copied']:
+        click.echo(f"Copied as-is (already at or below the target version): {report['copied']} files")
+    if incremental:
+        click.echo(f"Skipped (unchanged): {report['skipped']} files")
+    if report['timed_out']:
+        click.echo(f"Timed out (stopped after {timeout:g} s): {report['timed_out']} files")
     
     if errors:
         click.echo("\nErrors occurred during processing:")
@@ -114,4 +764,5 @@ def main(input_paths, output, version, recursive, overwrite):
             click.echo(f"  - {error}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # worker processes in the PyInstaller build
     main()
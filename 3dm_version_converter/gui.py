@@ -3,8 +3,12 @@
 3DM Version Converter GUI
 Browse for files or a folder, choose target Rhino version, select output location, and convert.
 """
+import heapq
+import multiprocessing
 import os
 import threading
+import time
+from collections import deque
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
@@ -13,18 +17,146 @@ import rhino3dm  # ensure installed via requirements.txt
 
 # Import functions from converter.py
 import converter as conv
+from workers import WorkerPool
 
 APP_TITLE = "TANGBL.3dm File Downsaver"
 
 # Light mode (default system theme)
 # Dark theme disabled; using platform default ttk styles.
 
+# Results are collected by the worker thread and shown in one UI update per tick
+UI_REFRESH_MS = 200
+# Lines kept in the log view; the full log of a run goes to a file
+MAX_LOG_LINES = 2000
+SLOWEST_SHOWN = 5
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+def _format_seconds(value):
+    return '-' if value is None else f"{value:.2f} s"
+
+
+class ThroughputStats:
+    """Running totals behind the throughput panel.
+
+    The worker thread reports each file as it is picked up and when it is
+    done; the UI reads a :meth:`snapshot` on a timer. The ETA is weighted by
+    bytes: files not found yet are assumed to be as large as the average so far.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.stopped = None
+        self.files_seen = 0
+        self.bytes_seen = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.read_seconds = 0.0
+        self.write_seconds = 0.0
+        self.timed_files = 0
+        self.last = None
+        self._slowest = []  # min-heap of (seconds, name, size, read, write)
+
+    def discovered(self, size):
+        with self._lock:
+            self.files_seen += 1
+            self.bytes_seen += size
+
+    def record(self, path, size, seconds, read=None, write=None):
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+            if read is not None and write is not None:
+                self.read_seconds += read
+                self.write_seconds += write
+                self.timed_files += 1
+            self.last = (path.name, read, write)
+            entry = (seconds, path.name, size, read, write)
+            if len(self._slowest) < SLOWEST_SHOWN:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def stop(self):
+        self.stopped = time.monotonic()
+
+    def snapshot(self, estimated_total):
+        with self._lock:
+            elapsed = (self.stopped or time.monotonic()) - self.started
+            eta = None
+            if self.bytes_done and elapsed > 0 and not self.stopped:
+                mean_size = self.bytes_seen / self.files_seen
+                remaining = (self.bytes_seen - self.bytes_done
+                             + max(0, estimated_total - self.files_seen) * mean_size)
+                eta = remaining / (self.bytes_done / elapsed)
+            return {
+                'elapsed': elapsed,
+                'eta': eta,
+                'filesPerSec': self.files_done / elapsed if elapsed > 0 else 0.0,
+                'mbPerSec': self.bytes_done / elapsed / (1024 * 1024) if elapsed > 0 else 0.0,
+                'avgRead': self.read_seconds / self.timed_files if self.timed_files else None,
+                'avgWrite': self.write_seconds / self.timed_files if self.timed_files else None,
+                'last': self.last,
+                'slowest': sorted(self._slowest, reverse=True),
+            }
+
+class LogBuffer:
+    """Log of one run, shared between the worker thread and the log view.
+
+    Every line is written to ``path`` (if given). Only the last ``max_lines``
+    lines, and separately the last ``max_lines`` errors, are kept in memory
+    for the view, which picks up new lines in batches with :meth:`take_new`.
+    """
+
+    def __init__(self, path=None, max_lines=MAX_LOG_LINES):
+        self.path = path
+        self._lock = threading.Lock()
+        self._lines = deque(maxlen=max_lines)
+        self._errors = deque(maxlen=max_lines)
+        self._new = deque(maxlen=max_lines)  # not shown yet
+        self._file = open(path, 'w', encoding='utf-8') if path else None
+
+    def write(self, text, error=False):
+        with self._lock:
+            self._lines.append((text, error))
+            if error:
+                self._errors.append((text, error))
+            self._new.append((text, error))
+            if self._file:
+                self._file.write(text)
+
+    def take_new(self):
+        """Return the ``(text, error)`` entries added since the last call."""
+        with self._lock:
+            entries = list(self._new)
+            self._new.clear()
+            return entries
+
+    def snapshot(self, errors_only=False):
+        """Return the retained entries, restarting :meth:`take_new` from here."""
+        with self._lock:
+            self._new.clear()
+            return list(self._errors if errors_only else self._lines)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
 class ConverterGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title(APP_TITLE)
-        self.geometry("700x520")
-        self.minsize(640, 480)
+        self.geometry("760x720")
+        self.minsize(680, 620)
 
         # Use default light theme (system/ttk defaults). No custom dark styling.
         self.input_files = []  # list[Path]
@@ -33,6 +165,9 @@ class ConverterGUI(tk.Tk):
         self.recursive = tk.BooleanVar(value=False)
         self.mode = tk.StringVar(value="files")  # 'files' or 'folder'
         self.version = tk.StringVar(value='7')
+        self.timeout = tk.IntVar(value=600)  # seconds per file, 0 = no limit
+        self.jobs = tk.IntVar(value=min(4, os.cpu_count() or 1))  # worker processes
+        self.errors_only = tk.BooleanVar(value=False)
 
         self._build_ui()
 
@@ -70,6 +205,12 @@ class ConverterGUI(tk.Tk):
         ttk.Label(opts_frame, text="Target Rhino version:").pack(side='left', padx=10, pady=6)
         self.version_combo = ttk.Combobox(opts_frame, values=list(conv.RHINO_VERSIONS.keys()), textvariable=self.version, state='readonly', width=6)
         self.version_combo.pack(side='left', padx=10, pady=6)
+        ttk.Label(opts_frame, text="Stop a file after (s, 0 = never):").pack(side='left', padx=10, pady=6)
+        self.timeout_spin = ttk.Spinbox(opts_frame, from_=0, to=86400, increment=60, textvariable=self.timeout, width=7)
+        self.timeout_spin.pack(side='left', padx=10, pady=6)
+        ttk.Label(opts_frame, text="Parallel files:").pack(side='left', padx=10, pady=6)
+        self.jobs_spin = ttk.Spinbox(opts_frame, from_=1, to=64, textvariable=self.jobs, width=4)
+        self.jobs_spin.pack(side='left', padx=10, pady=6)
 
         # Run controls
         run_frame = ttk.Frame(self)
@@ -87,16 +228,49 @@ class ConverterGUI(tk.Tk):
         self.status_var = tk.StringVar(value="Idle")
         ttk.Label(prog_frame, textvariable=self.status_var).pack(anchor='w', padx=12, pady=4)
 
+        # Throughput
+        dash_frame = ttk.LabelFrame(self, text="Throughput")
+        dash_frame.pack(fill='x', **pad)
+        self.dash_vars = {}
+        for column, (key, title) in enumerate([
+            ('elapsed', 'Elapsed'), ('eta', 'ETA'), ('files', 'Files/s'), ('mb', 'MB/s'),
+            ('avg', 'Avg read / write'), ('last', 'Last file read / write'),
+        ]):
+            ttk.Label(dash_frame, text=title).grid(row=0, column=column, sticky='w', padx=8)
+            self.dash_vars[key] = tk.StringVar(value='-')
+            ttk.Label(dash_frame, textvariable=self.dash_vars[key]).grid(row=1, column=column, sticky='w', padx=8)
+        ttk.Label(dash_frame, text="Slowest files").grid(row=2, column=0, columnspan=6, sticky='w', padx=8, pady=(6, 0))
+        self.slowest = ttk.Treeview(dash_frame, columns=('file', 'size', 'total', 'read', 'write'),
+                                    show='headings', height=SLOWEST_SHOWN)
+        for column, title, width in [('file', 'File', 300), ('size', 'MB', 70), ('total', 'Total s', 70),
+                                     ('read', 'Read s', 70), ('write', 'Write s', 70)]:
+            self.slowest.heading(column, text=title)
+            self.slowest.column(column, width=width, anchor='w' if column == 'file' else 'e')
+        self.slowest.grid(row=3, column=0, columnspan=6, sticky='ew', padx=8, pady=(2, 8))
+        dash_frame.columnconfigure(5, weight=1)
+
         # Log
         log_frame = ttk.LabelFrame(self, text="Log")
         log_frame.pack(fill='both', expand=True, **pad)
+        log_bar = ttk.Frame(log_frame)
+        log_bar.pack(fill='x', padx=10, pady=(6, 0))
+        ttk.Checkbutton(log_bar, text="Errors only", variable=self.errors_only, command=self._reload_log).pack(side='left')
+        self.log_path_var = tk.StringVar(value="")
+        ttk.Label(log_bar, textvariable=self.log_path_var).pack(side='left', padx=10)
         self.log = tk.Text(log_frame, height=12, wrap='word')
         self.log.pack(fill='both', expand=True, padx=10, pady=8)
         self._refresh_state()
 
         # Worker control
         self._worker = None
+        self._pool = None
+        self._stats = None
+        self._discovery = None
         self._cancel_flag = threading.Event()
+        # Filled by the worker thread, drained by _tick on the Tk thread
+        self._log_buffer = LogBuffer()
+        self._progress = (0, 1, False)
+        self._result = None
 
     def _refresh_state(self):
         mode = self.mode.get()
@@ -143,94 +317,200 @@ class ConverterGUI(tk.Tk):
             messagebox.showerror(APP_TITLE, 'Please select an output directory.')
             return
 
-        # Prepare list of files to process
-        files = []
-        try:
-            if mode == 'files':
-                files = [p for p in self.input_files if p.suffix.lower() == '.3dm']
-            else:
-                if self.recursive.get():
-                    files = list(Path(self.input_dir).rglob('*.3dm'))
-                else:
-                    files = list(Path(self.input_dir).glob('*.3dm'))
-        except Exception as e:
-            messagebox.showerror(APP_TITLE, f'Error reading inputs: {e}')
-            return
-
-        if not files:
-            messagebox.showwarning(APP_TITLE, 'No .3dm files found to convert.')
-            return
+        # Folders are scanned lazily while converting, so work starts right away
+        if mode == 'files':
+            files = [p for p in self.input_files if p.suffix.lower() == '.3dm']
+            if not files:
+                messagebox.showwarning(APP_TITLE, 'No .3dm files found to convert.')
+                return
+            discovery = conv.FileDiscovery(files)
+        else:
+            discovery = conv.FileDiscovery([self.input_dir], recursive=self.recursive.get())
 
         # Target version
         target_version = conv.get_version_number(self.version.get())
+        try:
+            timeout = max(0, self.timeout.get())
+            jobs = max(1, self.jobs.get())
+        except tk.TclError:
+            messagebox.showerror(APP_TITLE, 'The time limit and parallel files must be whole numbers.')
+            return
+        # Conversions run in worker processes so a stuck file can be stopped
+        self._pool = pool = WorkerPool(jobs, timeout or None)
 
         # UI state
         self._set_running(True)
         self.prog['value'] = 0
-        self.prog['maximum'] = len(files)
-        self.status_var.set(f"Converting {len(files)} files to Rhino {self.version.get()}...")
+        self.prog['maximum'] = 1
+        self.status_var.set(f"Converting files to Rhino {self.version.get()}...")
         self.log.delete('1.0', 'end')
         self._cancel_flag.clear()
+        try:
+            log_path = Path(self.output_dir) / f"3dm-converter-{time.strftime('%Y%m%d-%H%M%S')}.log"
+            self._log_buffer = LogBuffer(log_path)
+            self.log_path_var.set(f"Full log: {log_path}")
+        except OSError as ex:
+            self._log_buffer = LogBuffer()
+            self.log_path_var.set(f"Full log not saved: {ex}")
+        self._progress = (0, 1, False)
+        self._result = None
+        self._stats = stats = ThroughputStats()
+        self._discovery = discovery
 
         # Run in background thread
         def worker():
             processed = 0
             errors = 0
-            for src in files:
-                if self._cancel_flag.is_set():
-                    break
-                try:
+            timed_out = 0
+            sizes = {}
+
+            def tasks():
+                nonlocal errors
+                for src in discovery:
+                    if self._cancel_flag.is_set():
+                        return
                     # Build output path preserving structure if folder mode
                     if mode == 'folder':
-                        rel = src.relative_to(self.input_dir)
-                        out_path = Path(self.output_dir) / rel
+                        out_path = Path(self.output_dir) / src.relative_to(self.input_dir)
                     else:
                         out_path = Path(self.output_dir) / src.name
-
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    ok, err = conv.convert_file(src, out_path, target_version)
-                    processed += 1 if ok else 0
-                    errors += 0 if ok else 1
-
-                    self._append_log(f"{'OK' if ok else 'ERR'}: {src} -> {out_path}\n" + (f"    {err}\n" if err else ""))
-                except Exception as ex:
+                    try:
+                        out_path.parent.mkdir(parents=True, exist_ok=True)
+                        sizes[src] = src.stat().st_size
+                    except OSError as ex:
+                        errors += 1
+                        self._log(f"ERR: {src} -> {ex}\n", error=True)
+                        continue
+                    stats.discovered(sizes[src])
+                    yield src, {target_version: out_path}, False
+
+            try:
+                # Files already at or below the target version are copied as they are
+                for src, outputs, (results, info) in conv.convert_in_workers(tasks(), pool, copy_current=True):
+                    ok, err = results[target_version]
+                    out_path = outputs[target_version]
+                    size = sizes.pop(src, 0)
+                    timings = info.get('timings', {})
+                    if info.get('cancelled'):
+                        self._log(f"CANCELLED: {src}\n")
+                        continue
+                    if info.get('timedOut'):
+                        timed_out += 1
+                        stats.record(src, size, timeout)
+                        self._log(f"TIMEOUT: {src} -> stopped after {timeout:g} s\n", error=True)
+                    else:
+                        stats.record(src, size, info.get('seconds', 0.0), timings.get('read'), timings.get('write'))
+                        processed += 1 if ok else 0
+                        errors += 0 if ok else 1
+                        label = ('COPY' if info.get('copied') else 'OK') if ok else 'ERR'
+                        times = f" (read {timings['read']:.2f} s, write {timings['write']:.2f} s)" if timings else ""
+                        self._log(f"{label}: {src} -> {out_path}{times}\n" + (f"    {err}\n" if err else ""), error=not ok)
+                    self._progress = (processed + errors + timed_out, discovery.estimated_total, discovery.done)
+            except Exception as ex:
+                # Submitting after Cancel shut the pool down is expected
+                if not self._cancel_flag.is_set():
                     errors += 1
-                    self._append_log(f"ERR: {src} -> {ex}\n")
-                finally:
-                    self._step_progress()
+                    self._log(f"ERR: {ex}\n", error=True)
+            finally:
+                pool.shutdown(kill=True)
+                stats.stop()
 
-            self.after(0, self._finish, processed, errors)
+            for error in discovery.errors:
+                self._log(f"ERR: {error}\n", error=True)
+            self._log_buffer.close()
+            self._result = (processed, errors, timed_out, discovery.found == 0)
 
         self._worker = threading.Thread(target=worker, daemon=True)
         self._worker.start()
+        self._tick()
 
     def _set_running(self, running: bool):
         self.run_btn.config(state='disabled' if running else 'normal')
         self.cancel_btn.config(state='normal' if running else 'disabled')
         self.version_combo.config(state='disabled' if running else 'readonly')
+        self.timeout_spin.config(state='disabled' if running else 'normal')
+        self.jobs_spin.config(state='disabled' if running else 'normal')
 
     def _cancel(self):
         if self._worker and self._worker.is_alive():
             self._cancel_flag.set()
             self.status_var.set('Cancelling...')
-
-    def _append_log(self, text: str):
-        def _do():
-            self.log.insert('end', text)
+            # Stops the file being converted right now, not just the ones after it
+            self._pool.shutdown(wait=False, kill=True)
+
+    def _log(self, text: str, error: bool = False):
+        # Called from the worker thread; shown on the next tick
+        self._log_buffer.write(text, error)
+
+    def _show_log_entries(self, entries):
+        # Only follow new lines if the user hasn't scrolled up to read older ones
+        at_end = self.log.yview()[1] >= 0.999
+        errors_only = self.errors_only.get()
+        text = ''.join(line for line, error in entries if error or not errors_only)
+        if not text:
+            return
+        self.log.insert('end', text)
+        lines = int(self.log.index('end-1c').split('.')[0])
+        if lines > MAX_LOG_LINES:
+            self.log.delete('1.0', f'{lines - MAX_LOG_LINES + 1}.0')
+        if at_end:
             self.log.see('end')
-        self.after(0, _do)
 
-    def _step_progress(self):
-        def _do():
-            self.prog.step(1)
-        self.after(0, _do)
+    def _reload_log(self):
+        self.log.delete('1.0', 'end')
+        self._show_log_entries(self._log_buffer.snapshot(self.errors_only.get()))
+
+    def _tick(self):
+        """Apply everything the worker thread reported since the last tick in one go."""
+        # Read first: the worker logs everything before setting the result
+        result = self._result
+        self._show_log_entries(self._log_buffer.take_new())
 
-    def _finish(self, ok_count: int, err_count: int):
+        # The total is an estimate until discovery has finished scanning
+        done, total, exact = self._progress
+        self.prog.configure(maximum=max(total, done, 1), value=done)
+        if self._cancel_flag.is_set():
+            self.status_var.set('Cancelling...')
+        else:
+            self.status_var.set(
+                f"Converting to Rhino {self.version.get()}: {done} of {'' if exact else '~'}{max(total, done)} files"
+            )
+        self._refresh_dashboard()
+
+        if result is None:
+            self.after(UI_REFRESH_MS, self._tick)
+            return
+        processed, errors, timed_out, nothing_found = result
+        if nothing_found:
+            messagebox.showwarning(APP_TITLE, 'No .3dm files found to convert.')
+        self._finish(processed, errors, timed_out)
+
+    def _refresh_dashboard(self):
+        stats, discovery = self._stats, self._discovery
+        snap = stats.snapshot(discovery.estimated_total)
+        self.dash_vars['elapsed'].set(_format_duration(snap['elapsed']))
+        self.dash_vars['eta'].set('-' if snap['eta'] is None else _format_duration(snap['eta']))
+        self.dash_vars['files'].set(f"{snap['filesPerSec']:.2f}")
+        self.dash_vars['mb'].set(f"{snap['mbPerSec']:.2f}")
+        self.dash_vars['avg'].set(f"{_format_seconds(snap['avgRead'])} / {_format_seconds(snap['avgWrite'])}")
+        if snap['last']:
+            _, read, write = snap['last']
+            self.dash_vars['last'].set(f"{_format_seconds(read)} / {_format_seconds(write)}")
+        self.slowest.delete(*self.slowest.get_children())
+        for total, name, size, read, write in snap['slowest']:
+            self.slowest.insert('', 'end', values=(
+                name, f"{size / (1024 * 1024):.1f}", f"{total:.2f}",
+                '-' if read is None else f"{read:.2f}", '-' if write is None else f"{write:.2f}",
+            ))
+
+    def _finish(self, ok_count: int, err_count: int, timeout_count: int = 0):
+        counts = f"Converted: {ok_count}, Errors: {err_count}"
+        if timeout_count:
+            counts += f", Timed out: {timeout_count}"
         if self._cancel_flag.is_set():
-            self.status_var.set(f"Cancelled. Converted: {ok_count}, Errors: {err_count}")
+            self.status_var.set(f"Cancelled. {counts}")
         else:
-            self.status_var.set(f"Done. Converted: {ok_count}, Errors: {err_count}")
+            self.status_var.set(f"Done. {counts}")
         self._set_running(False)
 
 
@@ -239,4 +519,5 @@ def main():
     app.mainloop()
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # worker processes in the PyInstaller build
     main()
@@ -6,6 +6,7 @@ mkdir -p "$DIST_DIR"
 
 # Copy necessary files
 cp converter.py "$DIST_DIR/"
+cp workers.py "$DIST_DIR/"
 cp requirements.txt "$DIST_DIR/"
 cp README.md "$DIST_DIR/"
 cp convert.bat "$DIST_DIR/"
@@ -0,0 +1,232 @@
+import os
+import shutil
+
+import converter as conv
+
+
+def _inputs(tmp_path, model_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / 'in' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(model_path, path)
+        paths.append(path)
+    return paths
+
+
+def test_incremental_skips_unchanged_inputs(tmp_path, model_path):
+    a, b = _inputs(tmp_path, model_path, 'a.3dm', 'b.3dm')
+    out = tmp_path / 'out'
+
+    assert conv.process_files([tmp_path / 'in'], out, 5, incremental=True) == (2, [])
+    assert set(conv.load_manifest(out)) == {'a.3dm', 'b.3dm'}
+
+    report = {}
+    assert conv.process_files([tmp_path / 'in'], out, 5, incremental=True, report=report) == (0, [])
+    assert report['skipped'] == 2
+
+    # A new mtime alone is not a change; new content is
+    os.utime(a)
+    with open(b, 'ab') as f:
+        f.write(b'\0')
+    report = {}
+    conv.process_files([tmp_path / 'in'], out, 5, incremental=True, dry_run=True, report=report)
+    assert [(p.name, reason) for _, p, reason in report['planned']] == [('b.3dm', 'changed')]
+    assert report['skipped'] == 1
+
+
+def test_incremental_replaces_missing_output(tmp_path, model_path):
+    _inputs(tmp_path, model_path, 'a.3dm')
+    out = tmp_path / 'out'
+    conv.process_files([tmp_path / 'in'], out, 5, incremental=True)
+    (out / 'a.3dm').unlink()
+
+    assert conv.process_files([tmp_path / 'in'], out, 5, incremental=True) == (1, [])
+    assert (out / 'a.3dm').exists()
+
+
+def test_incremental_leaves_unrecorded_outputs_alone(tmp_path, model_path):
+    _inputs(tmp_path, model_path, 'a.3dm')
+    out = tmp_path / 'out'
+    out.mkdir()
+    (out / 'a.3dm').write_bytes(b'not ours')
+
+    processed, errors = conv.process_files([tmp_path / 'in'], out, 5, incremental=True)
+    assert processed == 0
+    assert 'Output exists' in errors[0]
+    assert (out / 'a.3dm').read_bytes() == b'not ours'
+
+
+def test_incremental_inputs_sharing_an_output(tmp_path, model_path):
+    # Recursing into one input directory flattens in/x/a.3dm and in/y/a.3dm to out/a.3dm
+    _inputs(tmp_path, model_path, 'x/a.3dm', 'y/a.3dm')
+    out = tmp_path / 'out'
+
+    processed, errors = conv.process_files([tmp_path / 'in'], out, 5, recursive=True, incremental=True)
+    assert processed == 1
+    assert len(errors) == 1 and 'Output exists' in errors[0]
+    owner = conv.load_manifest(out)['a.3dm']['input']
+
+    # Later runs settle instead of replacing each other's output
+    for _ in range(2):
+        report = {}
+        processed, errors = conv.process_files([tmp_path / 'in'], out, 5, recursive=True, incremental=True,
+                                               report=report)
+        assert processed == 0
+        assert report['skipped'] == 1
+        assert len(errors) == 1
+        assert conv.load_manifest(out)['a.3dm']['input'] == owner
+
+    report = {}
+    conv.process_files([tmp_path / 'in'], out, 5, recursive=True, incremental=True, dry_run=True, report=report)
+    assert report['planned'] == []
+    (blocked_input, _), = report['blocked']
+    assert str(blocked_input.resolve()) != owner
+
+
+def _version(path):
+    return conv.probe_file(path)['version']
+
+
+def test_convert_file_multi(tmp_path, model_path):
+    outputs = {version: tmp_path / f'a_v{version}.3dm' for version in (5, 6, 7)}
+    outputs[6].write_bytes(b'existing')
+    timings = {}
+
+    results = conv.convert_file_multi(model_path, outputs, timings=timings)
+    assert results[5] == (True, '') and results[7] == (True, '')
+    assert not results[6][0] and 'Output exists' in results[6][1]
+    assert outputs[6].read_bytes() == b'existing'
+    assert [_version(outputs[v]) for v in (5, 7)] == [5, 7]
+    assert set(timings) == {'read', 'write'}
+
+    # Only the listed versions may be replaced
+    results = conv.convert_file_multi(model_path, outputs, overwrite={6})
+    assert results[6] == (True, '') and _version(outputs[6]) == 6
+    assert not results[5][0]
+
+
+def test_convert_file_multi_unreadable_input(tmp_path):
+    bad = tmp_path / 'bad.3dm'
+    bad.write_bytes(b'not a model')
+    results = conv.convert_file_multi(bad, {5: tmp_path / 'a5.3dm', 6: tmp_path / 'a6.3dm'})
+    assert [ok for ok, _ in results.values()] == [False, False]
+
+
+def test_process_files_multi_version_layout(tmp_path, model_path):
+    _inputs(tmp_path, model_path, 'a.3dm')
+    out = tmp_path / 'out'
+    assert conv.process_files([tmp_path / 'in'], out, [5, 6]) == (2, [])
+    assert _version(out / 'rhino5' / 'a.3dm') == 5
+    assert _version(out / 'rhino6' / 'a.3dm') == 6
+
+
+def _tree(root, *names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+
+
+def _found(discovery, root):
+    return [path.relative_to(root).as_posix() for path in discovery]
+
+
+def test_discovery_order_and_filters(tmp_path):
+    _tree(tmp_path, 'b.3dm', 'a.3DM', 'notes.txt', 'sub/c.3dm', 'sub/deep/d.3dm', 'backup/e.3dm', 'sub/f.3dmbak')
+
+    assert _found(conv.FileDiscovery([tmp_path]), tmp_path) == ['b.3dm']
+    assert _found(conv.FileDiscovery([tmp_path], recursive=True, include=('*.3dm', '*.3DM')), tmp_path) == [
+        'a.3DM', 'b.3dm', 'backup/e.3dm', 'sub/c.3dm', 'sub/deep/d.3dm',
+    ]
+    # Name patterns skip whole directories, patterns with / match relative paths
+    discovery = conv.FileDiscovery([tmp_path], recursive=True, exclude=('backup', 'sub/deep/*'))
+    assert _found(discovery, tmp_path) == ['b.3dm', 'sub/c.3dm']
+    assert discovery.done and discovery.estimated_total == 2
+
+
+def test_discovery_yields_files_as_given(tmp_path):
+    _tree(tmp_path, 'x.3dm', 'd/y.3dm')
+    discovery = conv.FileDiscovery([tmp_path / 'x.3dm', tmp_path / 'd'])
+    assert _found(discovery, tmp_path) == ['x.3dm', 'd/y.3dm']
+
+
+def test_discovery_is_lazy(tmp_path):
+    _tree(tmp_path, 'a/1.3dm', 'b/2.3dm')
+    it = iter(conv.FileDiscovery([tmp_path], recursive=True))
+    next(it)
+    # Files created after the walk started are still picked up in unread directories
+    _tree(tmp_path, 'b/3.3dm')
+    assert [path.name for path in it] == ['2.3dm', '3.3dm']
+
+
+def test_discovery_symlinks(tmp_path):
+    _tree(tmp_path, 'real/a.3dm', 'other/b.3dm')
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'link.3dm').symlink_to(tmp_path / 'real' / 'a.3dm')
+    (root / 'dir').symlink_to(tmp_path / 'other')
+    (root / 'loop').symlink_to(root)
+
+    def found(symlinks):
+        return _found(conv.FileDiscovery([root], recursive=True, symlinks=symlinks), root)
+
+    assert found('skip') == []
+    assert found('files') == ['link.3dm']
+    assert found('follow') == ['link.3dm', 'dir/b.3dm']
+
+
+def test_probe_bytes(tmp_path, model_path):
+    v5 = tmp_path / 'a_v5.3dm'
+    assert conv.convert_file(model_path, v5, 5) == (True, '')
+
+    info = conv.probe_bytes(model_path.read_bytes()[:conv.PROBE_BYTES])
+    assert (info['archive_version'], info['version']) == (80, 8)
+    assert info['saved_by'] == 8
+    assert (conv.probe_file(v5)['archive_version'], conv.probe_file(v5)['version']) == (50, 5)
+
+    assert conv.probe_bytes(b'') is None
+    assert conv.probe_bytes(b'PK\x03\x04' + b'\0' * 60) is None
+    assert conv.probe_bytes(model_path.read_bytes()[:24] + b'garbage!') is None
+    assert conv.probe_file(tmp_path / 'missing.3dm') is None
+
+
+def test_copy_through(tmp_path, model_path):
+    v5 = tmp_path / 'a_v5.3dm'
+    conv.convert_file(model_path, v5, 5)
+    outputs = {version: tmp_path / f'out_v{version}.3dm' for version in (4, 5, 6)}
+    outputs[6].write_bytes(b'existing')
+
+    results, remaining = conv.copy_through(v5, outputs)
+    assert results[5] == (True, '')
+    assert outputs[5].read_bytes() == v5.read_bytes()
+    assert not results[6][0] and 'Output exists' in results[6][1]
+    assert remaining == {4: outputs[4]}
+
+    results, remaining = conv.copy_through(v5, {6: outputs[6]}, overwrite={6})
+    assert results == {6: (True, '')} and remaining == {}
+    assert outputs[6].read_bytes() == v5.read_bytes()
+
+
+def test_copy_through_not_a_model(tmp_path):
+    junk = tmp_path / 'junk.3dm'
+    junk.write_bytes(b'junk')
+    outputs = {5: tmp_path / 'out.3dm'}
+    assert conv.copy_through(junk, outputs) == ({}, outputs)
+
+
+def test_process_files_copies_current_files(tmp_path, model_path):
+    v5 = tmp_path / 'in' / 'a.3dm'
+    v5.parent.mkdir()
+    conv.convert_file(model_path, v5, 5)
+    out = tmp_path / 'out'
+
+    report = {}
+    assert conv.process_files([v5], out, [5, 7], report=report) == (2, [])
+    assert report['copied'] == 2
+    assert (out / 'rhino7' / 'a.3dm').read_bytes() == v5.read_bytes()
+
+    report = {}
+    conv.process_files([v5], tmp_path / 'forced', 7, copy_current=False, report=report)
+    assert report['copied'] == 0
+    assert _version(tmp_path / 'forced' / 'a.3dm') == 7
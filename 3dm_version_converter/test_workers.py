@@ -0,0 +1,108 @@
+import os
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+from click.testing import CliRunner
+
+import converter as conv
+from workers import ConversionTimeout, WorkerCrashed, WorkerPool
+
+
+def _pid():
+    return os.getpid()
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _exit(code):
+    os._exit(code)
+
+
+def _raise(message):
+    raise ValueError(message)
+
+
+def _set_marker(value):
+    os.environ['WORKER_MARKER'] = value
+
+
+def _marker():
+    return os.environ.get('WORKER_MARKER')
+
+
+def test_converts_in_worker(model_path, tmp_path):
+    output_path = tmp_path / 'model_v5.3dm'
+    with WorkerPool(timeout=60) as pool:
+        ok, err = pool.submit(conv.convert_file, model_path, output_path, 5).result()
+    assert ok, err
+    assert conv.probe_bytes(output_path.read_bytes()[:conv.PROBE_BYTES])['version'] == 5
+
+
+def test_task_exception_keeps_worker():
+    with WorkerPool() as pool:
+        pid = pool.submit(_pid).result()
+        with pytest.raises(ValueError, match='bad model'):
+            pool.submit(_raise, 'bad model').result()
+        assert pool.submit(_pid).result() == pid
+
+
+def test_timeout_kills_and_replaces_worker():
+    with WorkerPool(timeout=0.5) as pool:
+        pid = pool.submit(_pid).result()
+        start = time.monotonic()
+        with pytest.raises(ConversionTimeout) as info:
+            pool.submit(_sleep, 30).result()
+        assert time.monotonic() - start < 10
+        assert info.value.timeout == 0.5
+        # The next task runs in a fresh worker
+        assert pool.submit(_pid).result() != pid
+        # A per-task limit overrides the default
+        assert pool.submit(_sleep, 1, timeout=10).result() == 1
+
+
+def test_crash_fails_only_its_task():
+    with WorkerPool(workers=2) as pool:
+        crash = pool.submit(_exit, 3)
+        ok = pool.submit(_sleep, 0.5)
+        with pytest.raises(WorkerCrashed, match='exit code 3'):
+            crash.result()
+        assert ok.result() == 0.5
+        assert pool.submit(_pid).result()
+
+
+def test_recycles_workers():
+    with WorkerPool(max_tasks_per_worker=2) as pool:
+        pids = [pool.submit(_pid).result() for _ in range(4)]
+    assert pids[0] == pids[1]
+    assert pids[2] == pids[3]
+    assert pids[0] != pids[2]
+
+
+def test_initializer_runs_in_every_worker():
+    with WorkerPool(initializer=_set_marker, initargs=('ready',), max_tasks_per_worker=1) as pool:
+        assert [pool.submit(_marker).result() for _ in range(2)] == ['ready', 'ready']
+
+
+def test_shutdown_kill_cancels_tasks():
+    pool = WorkerPool()
+    running = pool.submit(_sleep, 30)
+    queued = pool.submit(_sleep, 30)
+    time.sleep(1)
+    pool.shutdown(kill=True)
+    with pytest.raises(CancelledError):
+        running.result(timeout=5)
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        pool.submit(_pid)
+
+
+def test_cli_timeout_stops_slow_files(model_path, tmp_path):
+    output_dir = tmp_path / 'out'
+    result = CliRunner().invoke(conv.main, [str(model_path), '-o', str(output_dir), '-v', '5', '--timeout', '0.001'])
+    assert result.exit_code == 0, result.output
+    assert 'Timed out (stopped after 0.001 s): 1 files' in result.output
+    assert not (output_dir / model_path.name).exists()
@@ -0,0 +1,282 @@
+"""
+Worker processes that can be stopped in the middle of a conversion.
+
+rhino3dm runs native code that Python cannot interrupt, so a file that makes
+``File3dm.Read`` spin can only be stopped by killing the process running it.
+:class:`WorkerPool` is a small process pool with the ``concurrent.futures``
+``submit`` interface (its futures work with ``wait``, ``as_completed`` and
+``asyncio.wrap_future``) where every task can have a wall-clock limit. A task
+that runs past its limit has its worker killed and replaced and its future
+fails with :class:`ConversionTimeout`. A worker that dies on its own (crash,
+OOM kill) only fails its own task, with :class:`WorkerCrashed`.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from functools import partial
+from concurrent.futures import CancelledError, Future
+from multiprocessing.connection import wait as wait_ready
+
+
+class ConversionTimeout(Exception):
+    """Raised when a task ran past its time limit and its worker was killed."""
+
+    def __init__(self, timeout):
+        super().__init__(f"Timed out after {timeout:g} s")
+        self.timeout = timeout
+
+
+class WorkerCrashed(Exception):
+    """Raised when a worker process exits while running a task."""
+
+
+def _worker_main(conn, initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        # Sent after unpickling, so importing fn's module doesn't count against the limit
+        conn.send(('started',))
+        try:
+            result = ('done', True, fn(*args))
+        except BaseException as e:
+            result = ('done', False, e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Unpicklable result or exception
+            conn.send(('done', False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.future = None
+        self.timeout = None
+        self.deadline = None
+        self.cancelled = False
+        self.tasks_done = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Process pool whose running tasks can be timed out and killed.
+
+    ``timeout`` is the default wall-clock limit in seconds per task (None for
+    no limit); it starts when the worker begins the task, not when it is
+    queued. ``initializer(*initargs)`` runs once in every new worker and
+    ``max_tasks_per_worker`` replaces a worker after that many tasks. Workers
+    are started on demand with ``mp_context`` (default: spawn).
+    """
+
+    def __init__(self, workers=1, timeout=None, initializer=None, initargs=(), max_tasks_per_worker=None,
+                 mp_context=None):
+        self.workers = max(1, workers)
+        self.timeout = timeout or None
+        self.max_tasks_per_worker = max_tasks_per_worker or None
+        self._initializer = initializer
+        self._initargs = initargs
+        self._ctx = mp_context or multiprocessing.get_context('spawn')
+        self._pending = deque()
+        self._idle = []
+        self._busy = []
+        self._lock = threading.RLock()
+        self._wakeup_reader, self._wakeup_writer = self._ctx.Pipe(duplex=False)
+        self._thread = None
+        self._shutdown = False
+        self._killed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    @property
+    def running(self):
+        return len(self._busy)
+
+    def submit(self, fn, *args, timeout=None):
+        """Schedule ``fn(*args)`` in a worker and return a Future for its result.
+
+        ``timeout`` overrides the pool's default limit for this task.
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot submit to a pool that was shut down')
+            self._pending.append((future, fn, args, timeout or self.timeout))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._manage, name='WorkerPool', daemon=True)
+                self._thread.start()
+        self._wakeup()
+        return future
+
+    def shutdown(self, wait=True, kill=False):
+        """Stop the pool once queued tasks are done.
+
+        With ``kill``, queued tasks are cancelled and running ones are killed;
+        their futures fail with ``CancelledError``.
+        """
+        with self._lock:
+            self._shutdown = True
+            if kill:
+                self._killed = True
+                while self._pending:
+                    future = self._pending.popleft()[0]
+                    # Only this step wakes wait() and as_completed() for a cancelled future
+                    future.cancel()
+                    future.set_running_or_notify_cancel()
+                # The manager thread fails their futures once it sees them exit
+                for worker in self._busy:
+                    worker.cancelled = True
+                    worker.process.kill()
+            thread = self._thread
+        self._wakeup()
+        if thread is None:
+            self._close()
+        elif wait:
+            thread.join()
+
+    def _wakeup(self):
+        with self._lock:
+            if not self._wakeup_writer.closed:
+                self._wakeup_writer.send_bytes(b'')
+
+    def _manage(self):
+        # Only bookkeeping happens under the lock: spawning, sending tasks, stopping
+        # workers and settling futures can take a while and submit() waits for it
+        while True:
+            self._dispatch()
+            with self._lock:
+                if self._shutdown and not self._pending and not self._busy:
+                    break
+                busy = list(self._busy)
+            deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+            wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            handles = [self._wakeup_reader]
+            for worker in busy:
+                handles += [worker.conn, worker.process.sentinel]
+            ready = wait_ready(handles, wait_for)
+            while self._wakeup_reader.poll():
+                self._wakeup_reader.recv_bytes()
+            retired = []
+            settled = []
+            with self._lock:
+                for worker in busy:
+                    if worker in self._busy:
+                        self._check(worker, ready, retired, settled)
+            # Workers are gone before their futures fail, so callers can clean up after them
+            for retire in retired:
+                retire()
+            for settle in settled:
+                settle()
+        self._close()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if not self._pending or not (self._idle or len(self._busy) < self.workers):
+                    return
+                future, fn, args, timeout = self._pending.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                worker = self._idle.pop() if self._idle else None
+            # Only this thread dispatches, so the free slot stays ours while the worker starts
+            if worker is None:
+                worker = _Worker(self._ctx, self._initializer, self._initargs)
+            try:
+                worker.conn.send((fn, args))
+            except OSError as e:
+                worker.kill()
+                future.set_exception(WorkerCrashed(f"Worker process is gone: {e}"))
+                continue
+            except Exception as e:
+                # fn or args could not be pickled; the worker never saw the task
+                with self._lock:
+                    self._idle.append(worker)
+                future.set_exception(e)
+                continue
+            worker.future = future
+            worker.timeout = timeout
+            worker.deadline = None
+            with self._lock:
+                self._busy.append(worker)
+                if self._killed:
+                    # shutdown(kill=True) ran while the task was being sent
+                    worker.cancelled = True
+                    worker.process.kill()
+
+    def _check(self, worker, ready, retired, settled):
+        """Update ``worker``'s state; workers to stop and futures to settle are added to ``retired`` and ``settled``."""
+        gone = False
+        while worker.conn in ready or worker.conn.poll():
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                gone = True
+                break
+            if message[0] == 'started':
+                if worker.timeout:
+                    worker.deadline = time.monotonic() + worker.timeout
+                ready = ()
+                continue
+            _, ok, value = message
+            future = worker.future
+            self._busy.remove(worker)
+            worker.future = None
+            worker.tasks_done += 1
+            if self.max_tasks_per_worker and worker.tasks_done >= self.max_tasks_per_worker:
+                retired.append(worker.stop)
+            else:
+                self._idle.append(worker)
+            settled.append(partial(future.set_result if ok else future.set_exception, value))
+            return
+
+        future = worker.future
+        if gone or not worker.process.is_alive():
+            self._busy.remove(worker)
+            retired.append(worker.kill)
+            if worker.cancelled:
+                settled.append(partial(future.set_exception, CancelledError()))
+            else:
+                # The exit code is known once kill() has joined the process
+                settled.append(lambda: future.set_exception(
+                    WorkerCrashed(f"Worker process exited unexpectedly (exit code {worker.process.exitcode})")
+                ))
+        elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+            self._busy.remove(worker)
+            retired.append(worker.kill)
+            settled.append(partial(future.set_exception, ConversionTimeout(worker.timeout)))
+
+    def _close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._wakeup_writer.close()
+        self._wakeup_reader.close()
+        for worker in idle:
+            worker.stop()
@@ -0,0 +1,24 @@
+"""Fixtures shared by the converter and service tests."""
+import sys
+from pathlib import Path
+
+import pytest
+
+converter_dir = Path(__file__).resolve().parent / "3dm_version_converter"
+if str(converter_dir) not in sys.path:
+    sys.path.insert(0, str(converter_dir))
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    """A small synthetic .3dm written by the benchmark's fixture generator."""
+    from benchmark import build_fixture
+
+    path = tmp_path_factory.mktemp("fixtures") / "model.3dm"
+    build_fixture(path, 1)
+    return path
+
+
+@pytest.fixture(scope="session")
+def model_bytes(model_path):
+    return model_path.read_bytes()
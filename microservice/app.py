@@ -1,19 +1,51 @@
+import asyncio
+import base64
+import hashlib
+import json
 import os
 import shutil
 import tempfile
+import zipfile
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List
+from urllib.parse import quote
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Query, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from starlette.background import BackgroundTask
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.background import BackgroundTasks
 
 # Ensure we can import converter from the repo
 import sys
+import time
 import uuid
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+
+from . import metrics
+from .batch import ZipStream
+from .cache import ConversionCache, cache_key
+from .encoding import (
+    DecodeError,
+    DecodedTooLarge,
+    StreamDecoder,
+    compress_bytes,
+    compress_file,
+    decode_file,
+    negotiate_encoding,
+    sniff_encoding,
+    strip_encoding_suffix,
+    supported_encodings,
+)
+from .engine import ConversionEngine, ConversionTooLarge, EngineSaturated
+from .jobs import JobManager, JobQueueFull
+from .shared_cache import SharedCache
+from .singleflight import SingleFlight
+from .uploads import ChunkError, UploadLimitReached, UploadManager
+
 repo_root = Path(__file__).resolve().parents[1]
 # Add the 3dm_version_converter package directory to sys.path so we can `import converter`
 converter_dir = repo_root / "3dm_version_converter"
@@ -27,22 +59,181 @@ MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "500")) * 1024 * 1024
 # Enforce a stricter cap for direct uploads to this endpoint; larger files must use S3.
 DIRECT_UPLOAD_MAX_BYTES = int(os.getenv("DIRECT_UPLOAD_MAX_MB", "100")) * 1024 * 1024
 CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Direct uploads up to this size are converted in memory without temp files (0 disables).
+IN_MEMORY_MAX_BYTES = int(float(os.getenv("IN_MEMORY_MAX_MB", "8")) * 1024 * 1024)
+
+# Conversion engine: rhino3dm runs in worker processes so the event loop stays free.
+# CONVERT_WORKERS defaults to the number of CPU cores; CONVERT_QUEUE_SIZE is how many
+# more conversions may wait for a worker before new requests get 503 + Retry-After.
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", "0")) or None
+CONVERT_QUEUE_SIZE = int(os.getenv("CONVERT_QUEUE_SIZE")) if os.getenv("CONVERT_QUEUE_SIZE") else None
+CONVERT_RETRY_AFTER = int(os.getenv("CONVERT_RETRY_AFTER", "5"))
+# A conversion still running after CONVERT_TIMEOUT_SECONDS has its worker killed and
+# the request gets 504 (0 = no limit).
+CONVERT_TIMEOUT_SECONDS = float(os.getenv("CONVERT_TIMEOUT_SECONDS", "300"))
+
+# Memory guard: rhino3dm holds the whole model in native memory. A conversion is
+# estimated to need CONVERT_MEMORY_BASE_MB plus CONVERT_MEMORY_FACTOR times the input
+# size; estimates of running and queued conversions must fit CONVERT_MEMORY_BUDGET_MB
+# (0 disables). CONVERT_WORKER_MEMORY_MB caps each worker's address space (0 = no cap)
+# and workers are replaced after CONVERT_MAX_TASKS_PER_WORKER conversions (0 = never).
+CONVERT_MEMORY_BUDGET_BYTES = int(os.getenv("CONVERT_MEMORY_BUDGET_MB", "0")) * 1024 * 1024
+CONVERT_WORKER_MEMORY_BYTES = int(os.getenv("CONVERT_WORKER_MEMORY_MB", "0")) * 1024 * 1024
+CONVERT_MEMORY_BASE_BYTES = int(float(os.getenv("CONVERT_MEMORY_BASE_MB", "64")) * 1024 * 1024)
+CONVERT_MEMORY_FACTOR = float(os.getenv("CONVERT_MEMORY_FACTOR", "4"))
+CONVERT_MAX_TASKS_PER_WORKER = int(os.getenv("CONVERT_MAX_TASKS_PER_WORKER", "0"))
+
+# Conversion result cache on local disk; set CACHE_MAX_MB=0 to disable.
+CACHE_DIR = Path(os.getenv("CACHE_DIR") or Path(tempfile.gettempdir()) / "tangbl-converter-cache")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_MB", "1024")) * 1024 * 1024
+# Cache shared by every instance, in S3_BUCKET under SHARED_CACHE_PREFIX (unset disables it).
+# Up to SHARED_CACHE_INDEX_SIZE keys known to be there are remembered for
+# SHARED_CACHE_INDEX_TTL_SECONDS so hits skip a HEAD request.
+SHARED_CACHE_PREFIX = os.getenv("SHARED_CACHE_PREFIX", "").strip("/")
+SHARED_CACHE_INDEX_SIZE = int(os.getenv("SHARED_CACHE_INDEX_SIZE", "10000"))
+SHARED_CACHE_INDEX_TTL_SECONDS = int(os.getenv("SHARED_CACHE_INDEX_TTL_SECONDS", "3600"))
+# Concurrent requests for the same input and version share one conversion;
+# COALESCE_CONVERSIONS=0 makes every request convert on its own.
+COALESCE_CONVERSIONS = os.getenv("COALESCE_CONVERSIONS", "1").lower() not in ("0", "false", "no")
+
+# Background jobs (POST /jobs): JOB_WORKERS conversions at a time, at most
+# JOB_QUEUE_SIZE waiting, results kept for JOB_TTL_SECONDS after they finish.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0")) or None
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+# Batch conversions (/convert-batch): at most BATCH_MAX_FILES files per request,
+# BATCH_CONCURRENCY of them converting at once (default: CONVERT_WORKERS).
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0")) or None
+
+# Resumable chunked uploads (/uploads): files up to MAX_UPLOAD_MB sent in chunks of
+# UPLOAD_CHUNK_MB (clients may pick up to UPLOAD_MAX_CHUNK_MB) into sparse files under
+# UPLOAD_DIR. At most UPLOAD_MAX_ACTIVE uploads at once; idle ones expire after UPLOAD_TTL_SECONDS.
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR") or Path(tempfile.gettempdir()) / "tangbl-converter-uploads")
+UPLOAD_CHUNK_BYTES = int(float(os.getenv("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024)
+UPLOAD_MAX_CHUNK_BYTES = int(float(os.getenv("UPLOAD_MAX_CHUNK_MB", "64")) * 1024 * 1024)
+UPLOAD_MAX_ACTIVE = int(os.getenv("UPLOAD_MAX_ACTIVE", "100"))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", "86400"))
 
 # S3 configuration (optional, used for presigned flow)
 # Use env vars if provided; otherwise fall back to safe defaults shared by the user.
 AWS_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "eu-north-1"
 S3_BUCKET = os.getenv("S3_BUCKET") or "3dm-converter-uploads-prod"
 S3_PREFIX = os.getenv("S3_PREFIX", "uploads/").rstrip("/")
+# With delivery=s3 converted files are uploaded under S3_OUTPUT_PREFIX and handed
+# out as presigned GET URLs valid for S3_OUTPUT_URL_EXPIRES seconds.
+S3_OUTPUT_PREFIX = os.getenv("S3_OUTPUT_PREFIX", "converted/").rstrip("/")
+S3_OUTPUT_URL_EXPIRES = int(os.getenv("S3_OUTPUT_URL_EXPIRES", "900"))
+DELIVERY_MODES = ("download", "s3")
+# Optional custom endpoint for S3-compatible storage (MinIO, R2) or a local moto server.
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+# Large objects are fetched as concurrent ranged GETs (and stored as multipart
+# uploads) of S3_PART_MB parts, S3_MAX_CONCURRENCY at a time.
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16")) * 1024 * 1024,
+    multipart_chunksize=int(os.getenv("S3_PART_MB", "16")) * 1024 * 1024,
+    max_concurrency=int(os.getenv("S3_MAX_CONCURRENCY", "8")),
+)
 s3_client = None
 if S3_BUCKET and AWS_REGION:
-    s3_client = boto3.client("s3", region_name=AWS_REGION)
+    s3_client = boto3.client("s3", region_name=AWS_REGION, endpoint_url=S3_ENDPOINT_URL)
 
 try:
     import converter as conv  # type: ignore
+    from workers import ConversionTimeout, WorkerCrashed  # type: ignore
 except Exception as e:
     raise RuntimeError(f"Failed to import converter.py from {converter_dir}: {e}")
 
-app = FastAPI(title="TANGBL.3dm File Downsaver - Converter Service")
+RHINO3DM_VERSION = getattr(conv.rhino3dm, "__version__", "unknown")
+
+cache = ConversionCache(CACHE_DIR, CACHE_MAX_BYTES)
+shared_cache = SharedCache(
+    s3_client,
+    S3_BUCKET,
+    SHARED_CACHE_PREFIX,
+    staging_dir=Path(tempfile.gettempdir()) / "tangbl-converter-shared-cache",
+    index_size=SHARED_CACHE_INDEX_SIZE,
+    ttl=SHARED_CACHE_INDEX_TTL_SECONDS,
+    transfer_config=S3_TRANSFER_CONFIG,
+)
+flights = SingleFlight(COALESCE_CONVERSIONS)
+engine = ConversionEngine(
+    workers=CONVERT_WORKERS,
+    queue_size=CONVERT_QUEUE_SIZE,
+    retry_after=CONVERT_RETRY_AFTER,
+    memory_budget=CONVERT_MEMORY_BUDGET_BYTES,
+    worker_memory_limit=CONVERT_WORKER_MEMORY_BYTES,
+    max_tasks_per_worker=CONVERT_MAX_TASKS_PER_WORKER,
+    timeout=CONVERT_TIMEOUT_SECONDS,
+)
+
+
+async def _run_job(job):
+    try:
+        await _convert_job(job)
+    except HTTPException as e:
+        metrics.record_error(e.status_code)
+        raise
+    except Exception:
+        metrics.record_error(reason="internal")
+        raise
+
+
+async def _convert_job(job):
+    params = job.params
+    label = _version_label(params["target_versions"])
+    job.tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-job-"))
+    try:
+        head = await _head_s3_input(params["key"])
+        # Jobs wait for a free worker instead of failing when the engine is saturated
+        if params["delivery"] == "s3" and not params["content_encoding"]:
+            job.result, outputs, input_bytes, job.cache_status = await _copy_or_convert_s3_object(
+                params["key"], params["input_name"], job.tmpdir, params["target_versions"], job.timings, head,
+                wait=True,
+            )
+            if job.result:
+                job.cleanup()
+                metrics.observe(label, job.timings, input_bytes)
+                return
+        else:
+            outputs, input_bytes, job.cache_status = await _convert_s3_object(
+                params["key"], params["input_name"], job.tmpdir, params["target_versions"], job.timings, head,
+                wait=True,
+            )
+    finally:
+        _delete_s3_object(S3_BUCKET, params["key"])
+
+    if params["delivery"] == "s3":
+        output_bytes = sum(path.stat().st_size for path in outputs.values())
+        job.result = await _deliver_s3(outputs, job.timings, params["content_encoding"])
+        job.cleanup()
+    else:
+        job.output_path = await _bundle(outputs, job.tmpdir, Path(params["input_name"]).stem, job.timings)
+        output_bytes = job.output_path.stat().st_size
+    metrics.observe(label, job.timings, input_bytes, output_bytes)
+
+
+jobs = JobManager(_run_job, workers=JOB_WORKERS or engine.workers, max_queued=JOB_QUEUE_SIZE, ttl=JOB_TTL_SECONDS)
+uploads = UploadManager(UPLOAD_DIR, ttl=UPLOAD_TTL_SECONDS, max_active=UPLOAD_MAX_ACTIVE)
+metrics.register(engine, jobs, cache, uploads, shared_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine.start()
+    await jobs.start()
+    await uploads.start()
+    try:
+        yield
+    finally:
+        await uploads.stop()
+        await jobs.stop()
+        engine.shutdown()
+        shared_cache.shutdown()
+
+
+app = FastAPI(title="TANGBL.3dm File Downsaver - Converter Service", lifespan=lifespan)
 
 # CORS
 # Default to the user's production domains and localhost if ALLOWED_ORIGINS is not set.
@@ -60,32 +251,478 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(HTTPException)
+async def count_http_errors(request: Request, exc: HTTPException):
+    metrics.record_error(exc.status_code)
+    return await http_exception_handler(request, exc)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
-@app.post("/convert")
-async def convert(file: UploadFile = File(...), targetVersion: str = Form(...)):
-    if not file.filename or not file.filename.lower().endswith(".3dm"):
-        raise HTTPException(status_code=400, detail="Only .3dm files are supported")
+@app.get("/metrics")
+async def prometheus_metrics():
+    payload, content_type = metrics.render()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**cache.stats(), "shared": shared_cache.stats()}
 
+
+def _content_disposition(filename: str) -> str:
+    """Attachment header for in-memory responses and S3 outputs, encoded like FileResponse does."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _after_response(target_version_num: int | str, *cleanup) -> BackgroundTasks:
+    """Background tasks for a streamed result: time the respond stage, then clean up.
+
+    Background tasks run once the body has been sent, so the delay since this
+    call is how long streaming the response took.
+    """
+    started = time.perf_counter()
+    tasks = BackgroundTasks()
+    tasks.add_task(lambda: metrics.observe(target_version_num, {"respond": time.perf_counter() - started}))
+    if cleanup:
+        tasks.add_task(*cleanup)
+    return tasks
+
+
+def _server_timing(timings: dict) -> str:
+    """Format stage durations (seconds) as a Server-Timing header value."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def _parse_target_versions(values: List[str]) -> list[int]:
+    """File versions from one or more ``targetVersion`` fields, e.g. ``6`` or ``5,6,7``."""
+    versions: list[int] = []
     try:
-        target_version_num = conv.get_version_number(targetVersion)
+        for value in values:
+            for part in value.split(","):
+                if part.strip():
+                    version = conv.get_version_number(part)
+                    if version not in versions:
+                        versions.append(version)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid targetVersion")
+    if not versions:
+        raise HTTPException(status_code=400, detail="Invalid targetVersion")
+    return versions
+
+
+def _version_label(target_versions: list[int]) -> int | str:
+    """Metrics label: the target version, or ``multi`` for a fan-out request."""
+    return target_versions[0] if len(target_versions) == 1 else "multi"
+
+
+def _memory_estimate(input_bytes: int) -> int:
+    """Bytes a conversion of an ``input_bytes`` file is expected to need."""
+    return CONVERT_MEMORY_BASE_BYTES + int(input_bytes * CONVERT_MEMORY_FACTOR)
+
 
-    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-"))
-    input_path = tmpdir / file.filename
+def _check_memory(input_bytes: int):
+    """Reject inputs whose conversion could never fit the memory limits with 413."""
+    limit = engine.memory_limit
+    if limit and _memory_estimate(input_bytes) > limit:
+        max_mb = max(0, limit - CONVERT_MEMORY_BASE_BYTES) / CONVERT_MEMORY_FACTOR / (1024 * 1024)
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large to convert on this server. Max about {max_mb:.0f} MB",
+        )
+
+
+async def _run_engine(fn, *args, timings: dict | None = None, input_bytes: int = 0, wait: bool = False):
+    """Run a converter function in the engine, mapping saturation to 503.
 
+    When ``timings`` is given, ``fn`` must accept a ``timings`` keyword and the
+    read/write durations it records are merged into the dict. ``input_bytes``
+    is the size of the file being converted, used to reserve memory for it.
+    With ``wait`` (jobs and batches) a saturated engine is waited out instead.
+    """
+    _check_memory(input_bytes)
+    memory = _memory_estimate(input_bytes) if input_bytes else 0
     try:
-        # Save upload in chunks with size limit
+        if timings is None:
+            return await engine.run(fn, *args, memory=memory, wait=wait)
+        result, stages = await engine.run_timed(fn, *args, memory=memory, wait=wait)
+        timings.update(stages)
+        return result
+    except EngineSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Converter is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ConversionTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"File too large to convert on this server: {e}")
+    except ConversionTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Conversion timed out after {e.timeout:g} s and was stopped")
+    except (MemoryError, WorkerCrashed):
+        # Hitting CONVERT_WORKER_MEMORY_MB either raises in the worker or aborts it
+        raise HTTPException(status_code=500, detail="Conversion failed: worker ran out of memory or crashed")
+
+
+def _cache_status(hits: int, lookups: int, coalesced: int = 0) -> str:
+    """``X-Conversion-Cache`` value; BYPASS when nothing needed converting.
+
+    COALESCED when every miss was taken from another request's conversion.
+    """
+    if not lookups:
+        return "BYPASS"
+    if hits == lookups:
+        return "HIT"
+    if coalesced and hits + coalesced == lookups:
+        return "COALESCED"
+    return "PARTIAL" if hits or coalesced else "MISS"
+
+
+async def _fetch_cached(keys: dict[int, str], paths: dict[int, Path], timings: dict) -> set[int]:
+    """Place the cached output for each version's key at its path, from the local cache or else the shared one.
+
+    Returns the versions found. Shared hits are added to the local cache.
+    """
+    found = await asyncio.gather(
+        *(asyncio.to_thread(cache.get, key, paths[version]) for version, key in keys.items())
+    )
+    hits = {version for version, hit in zip(keys, found) if hit}
+    missing = [version for version in keys if version not in hits]
+    if missing and shared_cache.enabled:
+        started = time.perf_counter()
+        found = await asyncio.gather(
+            *(asyncio.to_thread(shared_cache.get, keys[version], paths[version]) for version in missing)
+        )
+        timings["cache"] = time.perf_counter() - started
+        for version, hit in zip(missing, found):
+            if hit:
+                hits.add(version)
+                await asyncio.to_thread(cache.put, keys[version], paths[version])
+    return hits
+
+
+def _store_output(key: str, path: Path):
+    """Add a converted file to the local and shared caches; blocking, so run it in a thread."""
+    cache.put(key, path)
+    shared_cache.put(key, path)
+
+
+def _store_output_bytes(key: str, data: bytes):
+    """:func:`_store_output` for an output held in memory."""
+    cache.put_bytes(key, data)
+    shared_cache.put_bytes(key, data)
+
+
+async def _convert_versions(
+    input_path: Path,
+    tmpdir: Path,
+    target_versions: list[int],
+    timings: dict,
+    input_sha256: str | None = None,
+    source: dict | None = None,
+    wait: bool = False,
+) -> tuple[dict[int, Path], str]:
+    """Convert ``input_path`` to every target version with a single read.
+
+    Outputs are written to ``tmpdir``. Versions the input already meets
+    (per its header, or ``source`` from :func:`conv.probe_bytes`) are copied
+    through unchanged. With ``input_sha256`` the remaining versions are looked
+    up in and stored to the cache, and only the misses are converted; a miss
+    another request is converting right now is taken from that conversion.
+    Returns the output path per version and the ``X-Conversion-Cache`` status.
+    ``wait`` is passed on to :func:`_run_engine`.
+    """
+    stem = input_path.stem
+    outputs = {version: tmpdir / f"{stem}_v{version}.3dm" for version in target_versions}
+    # tmpdir belongs to this request, so outputs left by an earlier attempt
+    # (one retried after a 503) are simply replaced
+    copied, remaining = await asyncio.to_thread(conv.copy_through, input_path, outputs, True, source)
+    failed = [err for ok, err in copied.values() if not ok]
+    if failed:
+        raise HTTPException(status_code=500, detail=f"Conversion failed: {failed[0]}")
+    for version in copied:
+        metrics.COPIED.labels(str(version)).inc()
+
+    keys = {}
+    missing = remaining
+    if input_sha256:
+        keys = {version: cache_key(input_sha256, version, RHINO3DM_VERSION) for version in remaining}
+        hits = await _fetch_cached(keys, remaining, timings)
+        missing = {version: path for version, path in remaining.items() if version not in hits}
+
+    # Versions another request is converting right now are taken from its output
+    followed = {version: flights.follow(keys[version]) for version in missing if keys}
+    followed = {version: flight for version, flight in followed.items() if flight is not None}
+    led = {version: path for version, path in missing.items() if version not in followed}
+    if led:
+        await _convert_missing(input_path, led, keys, timings, wait=wait)
+
+    coalesced = 0
+    if followed:
+        started = time.perf_counter()
+        retry = {}
+        for version, flight in followed.items():
+            result = await flights.wait(flight)
+            if result is not None and await _place_output(result, missing[version]):
+                coalesced += 1
+                metrics.COALESCED.labels(str(version)).inc()
+            else:
+                retry[version] = missing[version]
+        timings["coalesce"] = time.perf_counter() - started
+        if retry:
+            # The leader went away before its output could be used
+            await _convert_missing(input_path, retry, keys, timings, lead=False, wait=wait)
+
+    return outputs, _cache_status(len(remaining) - len(missing), len(remaining), coalesced)
+
+
+async def _convert_missing(
+    input_path: Path,
+    missing: dict[int, Path],
+    keys: dict[int, str],
+    timings: dict,
+    lead: bool = True,
+    wait: bool = False,
+):
+    """Convert ``input_path`` to each version in ``missing`` with one engine run.
+
+    With ``keys``, outputs are stored in the caches and, if ``lead``, other
+    requests for the same keys attach to this conversion while it runs and
+    get each version's output path or failure.
+    """
+    lead = lead and bool(keys)
+    if lead:
+        for version in missing:
+            flights.lead(keys[version])
+    failed = []
+    try:
+        results = await _run_engine(
+            conv.convert_file_multi,
+            input_path,
+            missing,
+            True,
+            timings=timings,
+            input_bytes=input_path.stat().st_size,
+            wait=wait,
+        )
+        for version, path in missing.items():
+            ok, err = results.get(version, (False, "no result"))
+            if ok and not path.exists():
+                ok, err = False, "output missing"
+            if not ok:
+                failed.append(err if len(missing) == 1 else f"Rhino {version}: {err}")
+            elif keys:
+                await asyncio.to_thread(_store_output, keys[version], path)
+            if lead:
+                error = None if ok else HTTPException(status_code=500, detail=f"Conversion failed: {err}")
+                flights.land(keys[version], path, error)
+    except BaseException as e:
+        # Flights already landed are gone, so this only settles the rest
+        if lead:
+            for version in missing:
+                flights.land(keys[version], error=e)
+        raise
+    if failed:
+        raise HTTPException(status_code=500, detail=f"Conversion failed: {'; '.join(failed)}")
+
+
+async def _read_output(path: Path) -> bytes | None:
+    """Read a coalesced conversion's output file; None if it is already gone.
+
+    The file is opened before yielding, as its request may delete it as soon
+    as its own response is sent; an open file can still be read after that.
+    """
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        return await asyncio.to_thread(f.read)
+
+
+async def _place_output(result: Path | bytes, dest: Path) -> bool:
+    """Put a coalesced conversion's output at ``dest``; False if its file is already gone."""
+    if isinstance(result, bytes):
+        await asyncio.to_thread(dest.write_bytes, result)
+        return True
+    try:
+        # Linked before yielding, for the same reason as in _read_output
+        os.link(result, dest)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            src = result.open("rb")
+        except FileNotFoundError:
+            return False
+        with src, dest.open("wb") as f:
+            await asyncio.to_thread(shutil.copyfileobj, src, f, CHUNK_SIZE)
+    return True
+
+
+def _zip_outputs(outputs: dict[int, Path], zip_path: Path):
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in outputs.values():
+            archive.write(path, arcname=path.name)
+
+
+async def _bundle(outputs: dict[int, Path], tmpdir: Path, stem: str, timings: dict) -> Path:
+    """Return the single output, or a zip of all outputs for a multi-version request."""
+    if len(outputs) == 1:
+        return next(iter(outputs.values()))
+    started = time.perf_counter()
+    zip_path = tmpdir / f"{stem}_v{'-'.join(str(version) for version in outputs)}.zip"
+    await asyncio.to_thread(_zip_outputs, outputs, zip_path)
+    timings["zip"] = time.perf_counter() - started
+    return zip_path
+
+
+def _media_type(path: Path) -> str:
+    return "application/zip" if path.suffix == ".zip" else "application/octet-stream"
+
+
+def _check_filename(filename: str | None) -> str:
+    """Validate an uploaded file name and return it without any .gz/.zst suffix."""
+    name = strip_encoding_suffix(filename or "")
+    if not name.lower().endswith(".3dm"):
+        raise HTTPException(status_code=400, detail=f"Only .3dm files are supported: {filename}")
+    return name
+
+
+def _input_name(filename: str) -> str:
+    """Base name of a client-supplied file name, so inputs stay inside the request's temp dir."""
+    name = Path(strip_encoding_suffix(filename)).name
+    return name if name not in ("", ".", "..") else "input.3dm"
+
+
+def _check_header(source: dict | None, filename: str) -> dict:
+    """Reject input whose first bytes are not a .3dm header (``source`` from :func:`conv.probe_bytes`) with 415."""
+    if source is None:
+        raise HTTPException(status_code=415, detail=f"{Path(filename).name} is not a .3dm file (no 3DM header)")
+    return source
+
+
+async def _read_upload(file: UploadFile, sent_digest=None):
+    """Yield an upload in chunks, decompressing it on the fly if it was sent gzip or zstd compressed.
+
+    Compression is detected from the first bytes, so the size limits, cache
+    key and version probe all apply to the decompressed file. ``sent_digest``
+    (a hashlib object) is updated with the bytes as uploaded.
+    """
+    chunk = await file.read(CHUNK_SIZE)
+    encoding = sniff_encoding(chunk)
+    if encoding is None:
+        while chunk:
+            if sent_digest:
+                sent_digest.update(chunk)
+            yield chunk
+            chunk = await file.read(CHUNK_SIZE)
+        return
+    if encoding not in supported_encodings():
+        raise HTTPException(status_code=415, detail=f"{encoding} uploads are not supported on this server")
+    decoder = StreamDecoder(encoding, CHUNK_SIZE)
+    try:
+        while chunk:
+            if sent_digest:
+                sent_digest.update(chunk)
+            for data in decoder.decode(chunk):
+                yield data
+            chunk = await file.read(CHUNK_SIZE)
+        decoder.finish()
+    except DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decompress {file.filename}: {e}")
+
+
+def _encoding_headers(encoding: str | None) -> dict:
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def _result_encoding(compress: str | None, accept_encoding: str | None) -> str | None:
+    """Encoding to send or store results with, or None for uncompressed.
+
+    Results are only compressed when the client asks with ``compress``: an
+    encoding name, or ``auto`` for the best one its ``Accept-Encoding``
+    allows. Accept-Encoding alone is not enough, as proxies in front of the
+    service send it on their own and may not pass Content-Encoding on intact.
+    """
+    if not compress:
+        return None
+    compress = compress.strip().lower()
+    if compress == "auto":
+        return negotiate_encoding(accept_encoding)
+    if compress not in supported_encodings():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid compress, expected auto or one of: {', '.join(supported_encodings())}",
+        )
+    return compress
+
+
+async def _encode_output(output_path: Path, encoding: str | None, timings: dict | None = None) -> tuple[Path, dict]:
+    """Compress a converted file for the response with ``encoding`` (see :func:`_result_encoding`).
+
+    Returns the file to send and its encoding headers. Zips are sent as they
+    are, their entries are already compressed.
+    """
+    if output_path.suffix == ".zip":
+        return output_path, {}
+    if encoding:
+        started = time.perf_counter()
+        output_path = await asyncio.to_thread(compress_file, output_path, encoding)
+        if timings is not None:
+            timings["compress"] = time.perf_counter() - started
+    return output_path, _encoding_headers(encoding)
+
+
+@app.post("/convert")
+async def convert(
+    file: UploadFile = File(...),
+    targetVersion: List[str] = Form(...),
+    sha256: str | None = Form(None),
+    compress: str | None = Form(None),
+    accept_encoding: str | None = Header(None),
+):
+    """Convert an uploaded file.
+
+    Several ``targetVersion`` values (repeated fields or ``5,6,7``) convert the
+    upload once per version from a single read and return a zip of the results.
+    The upload may be gzip or zstd compressed; a single converted file is sent
+    compressed when asked for with ``compress``. ``sha256`` (hex), if given,
+    must match the file as uploaded.
+    """
+    input_name = Path(_check_filename(file.filename)).name
+    encoding = _result_encoding(compress, accept_encoding)
+
+    target_versions = _parse_target_versions(targetVersion)
+    target_version_num = target_versions[0]
+    label = _version_label(target_versions)
+
+    # Single-version uploads up to IN_MEMORY_MAX_BYTES are converted from memory;
+    # the temp directory is only created once an upload grows past that threshold.
+    tmpdir: Path | None = None
+    filename = f"{Path(input_name).stem}_v{target_version_num}.3dm"
+    timings: dict = {}
+    started = time.perf_counter()
+
+    try:
+        # Receive upload in chunks with size limit, hashing as we go for the cache key
+        # and validating the header before anything is written to disk
         total = 0
-        with input_path.open("wb") as f:
-            while True:
-                chunk = await file.read(CHUNK_SIZE)
-                if not chunk:
-                    break
+        digest = hashlib.sha256()
+        sent_digest = hashlib.sha256() if sha256 else None
+        buffered: list[bytes] = []
+        source = None
+        f = None
+        try:
+            async for chunk in _read_upload(file, sent_digest):
                 total += len(chunk)
                 # Absolute ceiling (safety)
                 if total > MAX_UPLOAD_BYTES:
@@ -93,33 +730,123 @@ async def convert(file: UploadFile = File(...), targetVersion: str = Form(...)):
                 # Direct-upload ceiling: force S3 for larger files
                 if total > DIRECT_UPLOAD_MAX_BYTES:
                     raise HTTPException(status_code=413, detail=f"File too large for direct upload. Use S3 flow for files over {(DIRECT_UPLOAD_MAX_BYTES // (1024*1024))} MB")
-                f.write(chunk)
+                # Stop receiving as soon as the file could no longer be converted here
+                _check_memory(total)
+                digest.update(chunk)
+                if total == len(chunk):
+                    # The header and comment block sit at the very start of the file
+                    source = _check_header(conv.probe_bytes(chunk), input_name)
+                if f is None and (len(target_versions) > 1 or total > IN_MEMORY_MAX_BYTES):
+                    # Fan-out conversions read the input from disk, and so do uploads
+                    # too big for memory: spill what we have so far
+                    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-"))
+                    f = (tmpdir / input_name).open("wb")
+                    f.writelines(buffered)
+                    buffered.clear()
+                if f is None:
+                    buffered.append(chunk)
+                else:
+                    f.write(chunk)
+            if not total:
+                _check_header(None, input_name)
+            if sent_digest and sent_digest.hexdigest() != sha256.strip().lower():
+                raise HTTPException(status_code=400, detail="Uploaded file does not match its SHA-256")
+        finally:
+            if f is not None:
+                f.close()
+        timings["receive"] = time.perf_counter() - started
+
+        source_headers = {"X-Source-Version": str(source["version"])}
 
-        # Build output path
-        stem = input_path.stem
-        output_path = tmpdir / f"{stem}_v{target_version_num}.3dm"
+        if tmpdir is None:
+            if source["version"] <= target_version_num:
+                # Already at or below the target version: hand the upload back as is
+                output = b"".join(buffered)
+                cache_status = "BYPASS"
+                metrics.COPIED.labels(str(target_version_num)).inc()
+            else:
+                key = cache_key(digest.hexdigest(), target_version_num, RHINO3DM_VERSION)
+                output = await asyncio.to_thread(cache.read, key)
+                if output is None and shared_cache.enabled:
+                    cache_started = time.perf_counter()
+                    output = await asyncio.to_thread(shared_cache.read, key)
+                    timings["cache"] = time.perf_counter() - cache_started
+                    if output is not None:
+                        await asyncio.to_thread(cache.put_bytes, key, output)
+                cache_status = "HIT" if output is not None else "MISS"
+                if output is None:
+                    async def _convert():
+                        output, err = await _run_engine(
+                            conv.convert_bytes, b"".join(buffered), target_version_num, timings=timings, input_bytes=total
+                        )
+                        if output is None:
+                            raise HTTPException(status_code=500, detail=f"Conversion failed: {err}")
+                        await asyncio.to_thread(_store_output_bytes, key, output)
+                        return output
 
-        ok, err = conv.convert_file(input_path, output_path, target_version_num)
-        if not ok:
-            raise HTTPException(status_code=500, detail=f"Conversion failed: {err}")
+                    coalesce_started = time.perf_counter()
+                    output, coalesced = await flights.do(key, _convert)
+                    if isinstance(output, Path):
+                        # Taken from a conversion that went through a temp file
+                        output = await _read_output(output)
+                    if output is None:
+                        output = await _convert()
+                    elif coalesced:
+                        timings["coalesce"] = time.perf_counter() - coalesce_started
+                        cache_status = "COALESCED"
+                        metrics.COALESCED.labels(str(target_version_num)).inc()
 
-        if not output_path.exists():
-            raise HTTPException(status_code=500, detail="Conversion failed: output missing")
+            output_bytes = len(output)
+            if encoding:
+                compress_started = time.perf_counter()
+                output = await asyncio.to_thread(compress_bytes, output, encoding)
+                timings["compress"] = time.perf_counter() - compress_started
+            metrics.observe(target_version_num, timings, total, output_bytes)
+            return Response(
+                content=output,
+                media_type="application/octet-stream",
+                headers={
+                    "Content-Disposition": _content_disposition(filename),
+                    "Cache-Control": "no-store",
+                    "X-Conversion-Cache": cache_status,
+                    "Server-Timing": _server_timing(timings),
+                    **source_headers,
+                    **_encoding_headers(encoding),
+                },
+                background=_after_response(target_version_num),
+            )
 
+        input_path = tmpdir / input_name
+        outputs, cache_status = await _convert_versions(
+            input_path, tmpdir, target_versions, timings, digest.hexdigest(), source
+        )
+        output_path = await _bundle(outputs, tmpdir, input_path.stem, timings)
+        output_bytes = output_path.stat().st_size
+        body_path, encoding_headers = await _encode_output(output_path, encoding, timings)
+
+        metrics.observe(label, timings, total, output_bytes)
         # Stream back result; cleanup directory when response is done
-        filename = output_path.name
         return FileResponse(
-            path=str(output_path),
-            media_type="application/octet-stream",
-            filename=filename,
-            headers={"Cache-Control": "no-store"},
-            background=BackgroundTask(shutil.rmtree, tmpdir, True),
+            path=str(body_path),
+            media_type=_media_type(output_path),
+            filename=output_path.name,
+            headers={
+                "Cache-Control": "no-store",
+                "X-Conversion-Cache": cache_status,
+                "Server-Timing": _server_timing(timings),
+                **source_headers,
+                **encoding_headers,
+            },
+            background=_after_response(label, shutil.rmtree, tmpdir, True),
         )
     except HTTPException:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
         raise
     except Exception as e:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        metrics.record_error(reason="internal")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
@@ -156,56 +883,805 @@ async def presign(filename: str = Query(..., min_length=1)):
     }
 
 
-def _cleanup_s3_and_tmpdir(bucket: str, key: str, tmpdir: Path):
+def _delete_s3_object(bucket: str, key: str):
     try:
         if bucket and key and s3_client:
             s3_client.delete_object(Bucket=bucket, Key=key)
     except Exception:
         pass
+
+
+def _cleanup_s3_and_tmpdir(bucket: str, key: str, tmpdir: Path):
+    _delete_s3_object(bucket, key)
     shutil.rmtree(tmpdir, ignore_errors=True)
 
 
-@app.post("/convert-by-key")
-async def convert_by_key(key: str = Form(...), targetVersion: str = Form(...), originalFilename: str | None = Form(None)):
-    if not s3_client or not S3_BUCKET:
-        raise HTTPException(status_code=400, detail="S3 not configured on server")
+async def _head_s3_input(key: str) -> dict:
+    """Look at an S3 input before downloading it.
 
+    Rejects it with 413 if it could never be converted here. Returns its
+    ``size`` and, when S3 keeps a full-object SHA-256 checksum for it (uploaded
+    with ``x-amz-checksum-sha256``), its ``sha256`` in hex, which finds cached
+    conversions without a download. Returns ``{}`` if the object can't be read;
+    the download reports that.
+    """
+    if not (engine.memory_limit or cache.enabled or shared_cache.enabled):
+        return {}
     try:
-        target_version_num = conv.get_version_number(targetVersion)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid targetVersion")
+        head = await asyncio.to_thread(
+            s3_client.head_object, Bucket=S3_BUCKET, Key=key, ChecksumMode="ENABLED"
+        )
+    except ClientError:
+        return {}
+    _check_memory(head["ContentLength"])
+    result = {"size": head["ContentLength"]}
+    checksum = head.get("ChecksumSHA256")
+    # Multipart uploads get a checksum of the part checksums instead ("...-<parts>")
+    if checksum and "-" not in checksum:
+        result["sha256"] = base64.b64decode(checksum).hex()
+    return result
 
-    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-s3-"))
-    input_name = originalFilename or Path(key).name
+
+async def _convert_s3_object(
+    key: str,
+    input_name: str,
+    tmpdir: Path,
+    target_versions: list[int],
+    timings: dict,
+    head: dict | None = None,
+    wait: bool = False,
+) -> tuple[dict[int, Path], int, str]:
+    """Download ``key`` from S3_BUCKET into ``tmpdir`` and convert it to every target version.
+
+    A gzip or zstd compressed object is decompressed to ``input_name`` first, and
+    anything without a .3dm header is rejected with 415 before it reaches a worker.
+    The input is hashed so cached conversions, and identical ones already running,
+    are reused; if its checksum is in ``head`` (from :func:`_head_s3_input`, looked
+    up when not given) and every version is cached, it isn't downloaded at all.
+    Returns the output path per version, the input size and the
+    ``X-Conversion-Cache`` status. Stage durations
+    (download, hash, decode, cache, coalesce, read, write) are recorded in ``timings``.
+    With ``wait`` a saturated engine is waited out rather than answered with 503.
+    """
+    if head is None:
+        head = await _head_s3_input(key)
+    input_sha256 = head.get("sha256")
+    if input_sha256:
+        outputs = {version: tmpdir / f"{Path(input_name).stem}_v{version}.3dm" for version in target_versions}
+        keys = {version: cache_key(input_sha256, version, RHINO3DM_VERSION) for version in target_versions}
+        if len(await _fetch_cached(keys, outputs, timings)) == len(outputs):
+            return outputs, head["size"], "HIT"
+
+    input_path, input_sha256, source = await _fetch_s3_input(key, input_name, tmpdir, head, timings)
+    outputs, cache_status = await _convert_versions(
+        input_path, tmpdir, target_versions, timings, input_sha256, source, wait
+    )
+    return outputs, input_path.stat().st_size, cache_status
+
+
+async def _copy_or_convert_s3_object(
+    key: str,
+    input_name: str,
+    tmpdir: Path,
+    target_versions: list[int],
+    timings: dict,
+    head: dict,
+    wait: bool = False,
+) -> tuple[dict | None, dict[int, Path], int, str]:
+    """:func:`_convert_s3_object` for ``delivery=s3`` without compression.
+
+    If every version is in the shared cache, the outputs are copied there
+    server-side (see :func:`_copy_cached_outputs`) instead of being fetched and
+    uploaded again. The input is only downloaded when ``head`` has no usable
+    checksum, to hash it. Returns ``(copied, outputs, input_bytes, cache_status)``:
+    ``copied`` is the delivery result when the outputs were copied (``outputs``
+    is then empty), else None.
+    """
+    copied = await _copy_cached_outputs(head.get("sha256"), input_name, target_versions, timings)
+    if copied:
+        return copied, {}, head["size"], "HIT"
+    input_path, input_sha256, source = await _fetch_s3_input(key, input_name, tmpdir, head, timings)
+    if input_sha256 != head.get("sha256"):
+        copied = await _copy_cached_outputs(input_sha256, input_name, target_versions, timings)
+        if copied:
+            return copied, {}, input_path.stat().st_size, "HIT"
+    outputs, cache_status = await _convert_versions(
+        input_path, tmpdir, target_versions, timings, input_sha256, source, wait
+    )
+    return None, outputs, input_path.stat().st_size, cache_status
+
+
+async def _fetch_s3_input(key: str, input_name: str, tmpdir: Path, head: dict, timings: dict) -> tuple[Path, str, dict]:
+    """Download ``key`` to ``tmpdir / input_name``, decompressed and header-checked.
+
+    Returns the input path, its SHA-256 (from ``head`` if it has the checksum of
+    what was downloaded) and the probed header.
+    """
     input_path = tmpdir / input_name
+    input_sha256 = head.get("sha256")
 
-    try:
-        # Download from S3 to temp file (streamed)
+    # Download from S3 to temp file off the event loop; objects above the
+    # multipart threshold are fetched as concurrent ranged GETs.
+    def _download():
+        started = time.perf_counter()
         with input_path.open("wb") as f:
-            s3_client.download_fileobj(S3_BUCKET, key, f)
+            s3_client.download_fileobj(S3_BUCKET, key, f, Config=S3_TRANSFER_CONFIG)
+        timings["download"] = time.perf_counter() - started
 
-        # Build output path
-        stem = input_path.stem
-        output_path = tmpdir / f"{stem}_v{target_version_num}.3dm"
+    await asyncio.to_thread(_download)
+    if await _decode_download(input_path, timings):
+        # The checksum was of the compressed object
+        input_sha256 = None
+    source = _check_header(await asyncio.to_thread(conv.probe_file, input_path), input_name)
+    if not input_sha256:
+        started = time.perf_counter()
+        input_sha256 = await asyncio.to_thread(_file_sha256, input_path)
+        timings["hash"] = time.perf_counter() - started
+    return input_path, input_sha256, source
 
-        ok, err = conv.convert_file(input_path, output_path, target_version_num)
-        if not ok:
-            raise HTTPException(status_code=500, detail=f"Conversion failed: {err}")
 
-        if not output_path.exists():
-            raise HTTPException(status_code=500, detail="Conversion failed: output missing")
+async def _decode_download(input_path: Path, timings: dict) -> str | None:
+    """Decompress a downloaded input in place if it is gzip or zstd compressed.
 
-        filename = output_path.name
-        return FileResponse(
-            path=str(output_path),
-            media_type="application/octet-stream",
-            filename=filename,
-            headers={"Cache-Control": "no-store"},
-            background=BackgroundTask(_cleanup_s3_and_tmpdir, S3_BUCKET, key, tmpdir),
+    Returns the encoding it was compressed with, or None.
+    """
+    with input_path.open("rb") as f:
+        encoding = sniff_encoding(f.read(4))
+    if encoding is None:
+        return None
+    started = time.perf_counter()
+    compressed_path = input_path.with_name(input_path.name + ".compressed")
+    input_path.rename(compressed_path)
+    try:
+        total = await asyncio.to_thread(decode_file, compressed_path, input_path, encoding, MAX_UPLOAD_BYTES, CHUNK_SIZE)
+    except DecodedTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"File too large. {e}")
+    except DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decompress {input_path.name}: {e}")
+    finally:
+        compressed_path.unlink(missing_ok=True)
+    timings["decode"] = time.perf_counter() - started
+    _check_memory(total)
+    return encoding
+
+
+def _output_key(filename: str) -> str:
+    file_id = uuid.uuid4().hex
+    return f"{S3_OUTPUT_PREFIX}/{file_id}/{filename}" if S3_OUTPUT_PREFIX else f"{file_id}/{filename}"
+
+
+_OUTPUT_CONTENT_TYPES = {".gz": "application/gzip", ".zst": "application/zstd"}
+
+
+def _output_args(filename: str) -> dict:
+    return {
+        "ContentType": _OUTPUT_CONTENT_TYPES.get(Path(filename).suffix, "application/octet-stream"),
+        "ContentDisposition": _content_disposition(filename),
+    }
+
+
+def _presigned_output(key: str, filename: str) -> dict:
+    url = s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": S3_BUCKET, "Key": key},
+        ExpiresIn=S3_OUTPUT_URL_EXPIRES,
+    )
+    return {
+        "url": url,
+        "key": key,
+        "bucket": S3_BUCKET,
+        "filename": filename,
+        "expiresIn": S3_OUTPUT_URL_EXPIRES,
+    }
+
+
+def _upload_output(output_path: Path, timings: dict | None = None, encoding: str | None = None) -> dict:
+    """Upload a converted file to S3_BUCKET and return a presigned download for it.
+
+    Files above the multipart threshold are uploaded in parallel parts. With
+    ``encoding`` a compressed copy is stored instead, as a plain
+    ``.gz``/``.zst`` file, so every client downloads the same bytes. The
+    upload duration (including compression) is recorded in ``timings`` when given.
+    """
+    started = time.perf_counter()
+    body_path = output_path
+    if encoding:
+        body_path = compress_file(output_path, encoding)
+    filename = body_path.name
+    key = _output_key(filename)
+    extra_args = _output_args(filename)
+    try:
+        s3_client.upload_file(
+            str(body_path),
+            S3_BUCKET,
+            key,
+            ExtraArgs=extra_args,
+            Config=S3_TRANSFER_CONFIG,
+        )
+        result = _presigned_output(key, filename)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload result: {e}")
+    if timings is not None:
+        timings["upload"] = time.perf_counter() - started
+
+    if encoding:
+        result["contentEncoding"] = encoding
+    return result
+
+
+async def _deliver_s3(outputs: dict[int, Path], timings: dict, encoding: str | None = None) -> dict:
+    """Upload the outputs to S3 and return their presigned downloads.
+
+    A single output keeps the flat shape of :func:`_upload_output`; several
+    are uploaded concurrently and listed under ``files``.
+    """
+    if len(outputs) == 1:
+        return await asyncio.to_thread(_upload_output, next(iter(outputs.values())), timings, encoding)
+    started = time.perf_counter()
+    files = await asyncio.gather(
+        *(asyncio.to_thread(_upload_output, path, None, encoding) for path in outputs.values())
+    )
+    timings["upload"] = time.perf_counter() - started
+    for version, result in zip(outputs, files):
+        result["targetVersion"] = version
+    return {"files": files}
+
+
+def _copy_output(shared_key: str, filename: str) -> dict | None:
+    key = _output_key(filename)
+    if not shared_cache.copy_to(shared_key, key, _output_args(filename)):
+        return None
+    return _presigned_output(key, filename)
+
+
+async def _copy_cached_outputs(
+    input_sha256: str | None, input_name: str, target_versions: list[int], timings: dict
+) -> dict | None:
+    """``delivery=s3`` straight from the shared cache, without downloading any output.
+
+    If every version of the input with ``input_sha256`` is in the shared cache,
+    each is copied server-side to the output prefix and the result has the
+    shape of :func:`_deliver_s3`; otherwise returns None and the caller
+    converts as usual.
+    """
+    if not shared_cache.enabled or not input_sha256:
+        return None
+    keys = {version: cache_key(input_sha256, version, RHINO3DM_VERSION) for version in target_versions}
+    started = time.perf_counter()
+    found = await asyncio.gather(*(asyncio.to_thread(shared_cache.contains, key) for key in keys.values()))
+    if not all(found):
+        return None
+    stem = Path(input_name).stem
+    files = await asyncio.gather(
+        *(asyncio.to_thread(_copy_output, keys[version], f"{stem}_v{version}.3dm") for version in target_versions)
+    )
+    if not all(files):
+        return None
+    timings["cache"] = time.perf_counter() - started
+    if len(files) == 1:
+        return files[0]
+    for version, result in zip(target_versions, files):
+        result["targetVersion"] = version
+    return {"files": files}
+
+
+async def _outputs_response(
+    outputs: dict[int, Path],
+    tmpdir: Path,
+    stem: str,
+    label: int | str,
+    timings: dict,
+    input_bytes: int,
+    delivery: str,
+    encoding: str | None,
+    *cleanup,
+    headers: dict | None = None,
+) -> Response:
+    """Hand converted outputs to the client per ``delivery`` and record the request metrics.
+
+    ``download`` streams the file (or a zip of several) back; ``s3`` uploads
+    the outputs and returns their presigned URLs. Either is compressed with
+    ``encoding`` if given. ``cleanup`` (a callable and its arguments) runs once the
+    response no longer needs ``tmpdir``.
+    """
+    headers = {"Cache-Control": "no-store", **(headers or {})}
+    if delivery == "s3":
+        output_bytes = sum(path.stat().st_size for path in outputs.values())
+        result = await _deliver_s3(outputs, timings, encoding)
+        metrics.observe(label, timings, input_bytes, output_bytes)
+        cleanup[0](*cleanup[1:])
+        result["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        return JSONResponse(content=result, headers={**headers, "Server-Timing": _server_timing(timings)})
+
+    output_path = await _bundle(outputs, tmpdir, stem, timings)
+    output_bytes = output_path.stat().st_size
+    body_path, encoding_headers = await _encode_output(output_path, encoding, timings)
+    metrics.observe(label, timings, input_bytes, output_bytes)
+    return FileResponse(
+        path=str(body_path),
+        media_type=_media_type(output_path),
+        filename=output_path.name,
+        headers={**headers, "Server-Timing": _server_timing(timings), **encoding_headers},
+        background=_after_response(label, *cleanup),
+    )
+
+
+def _check_delivery(delivery: str):
+    if delivery not in DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid delivery, expected one of: {', '.join(DELIVERY_MODES)}")
+
+
+@app.post("/convert-by-key")
+async def convert_by_key(
+    key: str = Form(...),
+    targetVersion: List[str] = Form(...),
+    originalFilename: str | None = Form(None),
+    delivery: str = Form("download"),
+    compress: str | None = Form(None),
+    accept_encoding: str | None = Header(None),
+):
+    """Convert an uploaded S3 object.
+
+    ``delivery=download`` streams the converted file back; ``delivery=s3``
+    uploads it to S3_BUCKET and returns a presigned GET URL instead. With
+    several target versions the download is a zip and ``delivery=s3`` returns
+    one presigned URL per version. The object may be gzip or zstd compressed,
+    and converted files are downloaded or stored compressed when asked for
+    with ``compress``.
+    """
+    if not s3_client or not S3_BUCKET:
+        raise HTTPException(status_code=400, detail="S3 not configured on server")
+
+    target_versions = _parse_target_versions(targetVersion)
+    label = _version_label(target_versions)
+    _check_delivery(delivery)
+    encoding = _result_encoding(compress, accept_encoding)
+
+    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-s3-"))
+    input_name = _input_name(originalFilename or Path(key).name)
+
+    timings: dict = {}
+
+    try:
+        head = await _head_s3_input(key)
+        if delivery == "s3" and not encoding:
+            result, outputs, input_bytes, cache_status = await _copy_or_convert_s3_object(
+                key, input_name, tmpdir, target_versions, timings, head
+            )
+            if result:
+                metrics.observe(label, timings, input_bytes)
+                _cleanup_s3_and_tmpdir(S3_BUCKET, key, tmpdir)
+                result["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+                return JSONResponse(
+                    content=result,
+                    headers={
+                        "Cache-Control": "no-store",
+                        "X-Conversion-Cache": cache_status,
+                        "Server-Timing": _server_timing(timings),
+                    },
+                )
+        else:
+            outputs, input_bytes, cache_status = await _convert_s3_object(
+                key, input_name, tmpdir, target_versions, timings, head
+            )
+        return await _outputs_response(
+            outputs, tmpdir, Path(input_name).stem, label, timings, input_bytes, delivery, encoding,
+            _cleanup_s3_and_tmpdir, S3_BUCKET, key, tmpdir,
+            headers={"X-Conversion-Cache": cache_status},
         )
     except HTTPException:
         _cleanup_s3_and_tmpdir(S3_BUCKET or "", key, tmpdir)
         raise
     except Exception as e:
         _cleanup_s3_and_tmpdir(S3_BUCKET or "", key, tmpdir)
+        metrics.record_error(reason="internal")
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.post("/uploads", status_code=201)
+async def create_upload(
+    filename: str = Form(...),
+    size: int = Form(..., gt=0),
+    chunkSize: int | None = Form(None),
+):
+    """Start a resumable upload of ``size`` bytes.
+
+    The response says which ``chunkSize`` to use (the requested one, clamped
+    to the server's limits) and how many chunks to send.
+    """
+    input_name = Path(_check_filename(filename)).name
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large. Max {(MAX_UPLOAD_BYTES // (1024*1024))} MB")
+    _check_memory(size)
+    chunk_size = min(max(chunkSize or UPLOAD_CHUNK_BYTES, 1024 * 1024), UPLOAD_MAX_CHUNK_BYTES)
+
+    try:
+        upload = uploads.create(input_name, size, chunk_size)
+    except UploadLimitReached:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many uploads in progress, please retry shortly",
+            headers={"Retry-After": str(engine.retry_after)},
+        )
+
+    return {
+        **upload.to_dict(),
+        "expiresIn": UPLOAD_TTL_SECONDS,
+        "chunkUrl": f"/uploads/{upload.id}/chunks/{{index}}",
+        "completeUrl": f"/uploads/{upload.id}/complete",
+    }
+
+
+def _get_upload(upload_id: str):
+    upload = uploads.get(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return upload
+
+
+@app.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Progress of a resumable upload; ``missing`` lists the chunks still to send."""
+    return _get_upload(upload_id).to_dict()
+
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: str | None = Header(None),
+):
+    """Store chunk ``index`` (zero-based) of an upload from the raw request body.
+
+    Chunks can be sent in any order, concurrently, and again after a failure.
+    With an ``X-Chunk-SHA256`` header (hex) the chunk is only accepted if it matches.
+    """
+    upload = _get_upload(upload_id)
+    try:
+        await uploads.write_chunk(upload, index, request.stream(), x_chunk_sha256)
+    except ChunkError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"uploadId": upload.id, "index": index, "received": len(upload.received), "chunks": upload.chunks}
+
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str):
+    await asyncio.to_thread(uploads.discard, _get_upload(upload_id))
+    return Response(status_code=204)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    targetVersion: List[str] = Form(...),
+    delivery: str = Form("download"),
+    sha256: str | None = Form(None),
+    compress: str | None = Form(None),
+    accept_encoding: str | None = Header(None),
+):
+    """Convert a fully received upload and respond like ``/convert-by-key``.
+
+    ``sha256`` (hex), if given, must match the whole uploaded file. The
+    upload is consumed either way; a failed conversion needs a new upload.
+    """
+    upload = _get_upload(upload_id)
+    target_versions = _parse_target_versions(targetVersion)
+    label = _version_label(target_versions)
+    _check_delivery(delivery)
+    encoding = _result_encoding(compress, accept_encoding)
+    if not upload.complete:
+        raise HTTPException(
+            status_code=409, detail=f"Upload is missing {len(upload.missing)} of {upload.chunks} chunks"
+        )
+    if upload.in_flight:
+        raise HTTPException(status_code=409, detail="Chunks are still being written")
+
+    uploads.take(upload)
+    tmpdir = upload.dir
+    timings: dict = {}
+    try:
+        started = time.perf_counter()
+        digest = await asyncio.to_thread(_file_sha256, upload.path)
+        timings["hash"] = time.perf_counter() - started
+        if sha256 and digest != sha256.strip().lower():
+            raise HTTPException(status_code=400, detail="Uploaded file does not match its SHA-256")
+        if await _decode_download(upload.path, timings):
+            # The cache is keyed by the decompressed file
+            digest = await asyncio.to_thread(_file_sha256, upload.path)
+        source = _check_header(await asyncio.to_thread(conv.probe_file, upload.path), upload.filename)
+
+        outputs, cache_status = await _convert_versions(upload.path, tmpdir, target_versions, timings, digest, source)
+        return await _outputs_response(
+            outputs, tmpdir, upload.path.stem, label, timings, upload.path.stat().st_size, delivery, encoding,
+            shutil.rmtree, tmpdir, True,
+            headers={"X-Conversion-Cache": cache_status},
+        )
+    except HTTPException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        metrics.record_error(reason="internal")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+def _check_batch(count: int):
+    if not count:
+        raise HTTPException(status_code=400, detail="No files in batch")
+    if count > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files in batch. Max {BATCH_MAX_FILES}")
+
+
+async def _save_upload(file: UploadFile, path: Path) -> tuple[str, dict]:
+    """Copy an upload to ``path`` under the direct-upload limits.
+
+    Compressed uploads are stored decompressed. The header is checked on the
+    first chunk, so anything that isn't a .3dm file is refused with 415
+    before it is written. Returns the file's SHA-256 and its probed header.
+    """
+    total = 0
+    digest = hashlib.sha256()
+    source = None
+    with path.open("wb") as f:
+        async for chunk in _read_upload(file):
+            if not total:
+                source = _check_header(conv.probe_bytes(chunk), file.filename)
+            total += len(chunk)
+            if total > DIRECT_UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{file.filename} is too large for direct upload. Use S3 flow for files over {(DIRECT_UPLOAD_MAX_BYTES // (1024*1024))} MB",
+                )
+            digest.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+    return digest.hexdigest(), _check_header(source, file.filename)
+
+
+async def _convert_batch_item(item: dict, target_versions: list[int], slots: asyncio.Semaphore) -> tuple:
+    """Convert one batch entry; returns ``(item, outputs, error, timings)`` and never raises."""
+    timings: dict = {}
+    input_path = item["dir"] / item["input_name"]
+    try:
+        if item["error"]:
+            # Refused while it was received
+            raise item["error"]
+        # Wait for a free worker like jobs do; the response has already started
+        async with slots:
+            if item["key"]:
+                outputs, input_bytes, _ = await _convert_s3_object(
+                    item["key"], item["input_name"], item["dir"], target_versions, timings, wait=True
+                )
+            else:
+                outputs, _ = await _convert_versions(
+                    input_path, item["dir"], target_versions, timings, item["sha256"], item["source"], wait=True
+                )
+                input_bytes = input_path.stat().st_size
+    except HTTPException as e:
+        metrics.record_error(e.status_code)
+        return item, None, str(e.detail), timings
+    except Exception as e:
+        metrics.record_error(reason="internal")
+        return item, None, str(e), timings
+    finally:
+        if item["key"]:
+            await asyncio.to_thread(_delete_s3_object, S3_BUCKET, item["key"])
+            item["key"] = None
+
+    metrics.observe(
+        _version_label(target_versions),
+        timings,
+        input_bytes,
+        sum(path.stat().st_size for path in outputs.values()),
+    )
+    return item, outputs, None, timings
+
+
+async def _stream_batch(items: list[dict], target_versions: list[int], tmpdir: Path):
+    """Convert ``items`` concurrently and yield a zip archive entry by entry as they finish.
+
+    Each item's files are deleted once its entries are written. The archive
+    ends with ``manifest.json`` describing the outcome of every item.
+    """
+    archive = ZipStream(CHUNK_SIZE)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY or engine.workers)
+    tasks = [asyncio.create_task(_convert_batch_item(item, target_versions, slots)) for item in items]
+    manifest = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item, outputs, error, timings = await next_done
+            entry = {"file": item["name"], "status": "failed" if error else "done"}
+            if outputs:
+                started = time.perf_counter()
+                entry["entries"] = []
+                for path in outputs.values():
+                    arcname = archive.unique_name(path.name)
+                    async for chunk in archive.add_file(path, arcname):
+                        yield chunk
+                    entry["entries"].append(arcname)
+                timings["zip"] = time.perf_counter() - started
+            if error:
+                entry["error"] = error
+            entry["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+            manifest.append(entry)
+            shutil.rmtree(item["dir"], ignore_errors=True)
+
+        yield archive.add_bytes("manifest.json", json.dumps({"files": manifest}, indent=2).encode())
+        yield archive.close()
+    finally:
+        # Client went away or we are done: stop pending conversions and drop
+        # S3 inputs that never got converted
+        for task in tasks:
+            task.cancel()
+        leftover = [item["key"] for item in items if item["key"]]
+        for key in leftover:
+            _delete_s3_object(S3_BUCKET, key)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _batch_response(items: list[dict], target_versions: list[int], tmpdir: Path) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_batch(items, target_versions, tmpdir),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": _content_disposition("converted.zip"),
+            "Cache-Control": "no-store",
+            "X-Batch-Files": str(len(items)),
+        },
+    )
+
+
+@app.post("/convert-batch")
+async def convert_batch(files: List[UploadFile] = File(...), targetVersion: List[str] = Form(...)):
+    """Convert many uploaded files and stream the results back as one zip.
+
+    Files are converted concurrently and each entry is streamed as soon as its
+    conversion finishes, so entries follow completion order, not upload order.
+    Failed files are listed in ``manifest.json`` at the end of the archive.
+    """
+    target_versions = _parse_target_versions(targetVersion)
+    _check_batch(len(files))
+    for file in files:
+        _check_filename(file.filename)
+
+    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-batch-"))
+    items = []
+    try:
+        for index, file in enumerate(files):
+            item_dir = tmpdir / str(index)
+            item_dir.mkdir()
+            input_name = strip_encoding_suffix(Path(file.filename).name)
+            item = {"name": file.filename, "input_name": input_name, "dir": item_dir, "key": None, "error": None}
+            try:
+                item["sha256"], item["source"] = await _save_upload(file, item_dir / input_name)
+            except HTTPException as e:
+                # Not a .3dm file: fail just this entry, in the manifest
+                if e.status_code != 415:
+                    raise
+                item.update(sha256=None, source=None, error=e)
+            items.append(item)
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+    return _batch_response(items, target_versions, tmpdir)
+
+
+@app.post("/convert-batch-by-key")
+async def convert_batch_by_key(keys: List[str] = Form(...), targetVersion: List[str] = Form(...)):
+    """Convert many uploaded S3 objects and stream the results back as one zip.
+
+    Works like ``/convert-batch``; each object is deleted once converted.
+    """
+    if not s3_client or not S3_BUCKET:
+        raise HTTPException(status_code=400, detail="S3 not configured on server")
+
+    target_versions = _parse_target_versions(targetVersion)
+    _check_batch(len(keys))
+
+    tmpdir = Path(tempfile.mkdtemp(prefix="tangbl-converter-batch-"))
+    items = []
+    for index, key in enumerate(keys):
+        item_dir = tmpdir / str(index)
+        item_dir.mkdir()
+        items.append(
+            {
+                "name": key,
+                "input_name": strip_encoding_suffix(Path(key).name),
+                "dir": item_dir,
+                "sha256": None,
+                "source": None,
+                "key": key,
+                "error": None,
+            }
+        )
+
+    return _batch_response(items, target_versions, tmpdir)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    key: str = Form(...),
+    targetVersion: List[str] = Form(...),
+    originalFilename: str | None = Form(None),
+    delivery: str = Form("download"),
+    compress: str | None = Form(None),
+    accept_encoding: str | None = Header(None),
+):
+    """Queue conversion of an uploaded S3 object and return its job id immediately.
+
+    With ``delivery=s3`` the result is stored compressed if asked for with
+    ``compress``; downloads choose their own when fetched.
+    """
+    if not s3_client or not S3_BUCKET:
+        raise HTTPException(status_code=400, detail="S3 not configured on server")
+
+    target_versions = _parse_target_versions(targetVersion)
+    _check_delivery(delivery)
+    await _head_s3_input(key)
+
+    try:
+        job = jobs.submit(
+            key=key,
+            input_name=_input_name(originalFilename or Path(key).name),
+            target_versions=target_versions,
+            delivery=delivery,
+            content_encoding=_result_encoding(compress, accept_encoding) if delivery == "s3" else None,
+        )
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many queued jobs, please retry shortly",
+            headers={"Retry-After": str(engine.retry_after)},
+        )
+
+    return {
+        **job.to_dict(),
+        "statusUrl": f"/jobs/{job.id}",
+        "resultUrl": f"/jobs/{job.id}/result",
+    }
+
+
+def _get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, compress: str | None = None, accept_encoding: str | None = Header(None)):
+    job = _get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.result:
+        # delivery=s3: the file is in S3, send the client straight there;
+        # several versions can't share one redirect, so list them instead
+        if "url" not in job.result:
+            return JSONResponse(content=job.result, headers={"X-Conversion-Cache": job.cache_status})
+        return RedirectResponse(
+            job.result["url"], status_code=307, headers={"X-Conversion-Cache": job.cache_status}
+        )
+
+    body_path, encoding_headers = await _encode_output(job.output_path, _result_encoding(compress, accept_encoding))
+    return FileResponse(
+        path=str(body_path),
+        media_type=_media_type(job.output_path),
+        filename=job.output_path.name,
+        headers={"Cache-Control": "no-store", "X-Conversion-Cache": job.cache_status, **encoding_headers},
+    )
@@ -0,0 +1,91 @@
+"""
+Streaming zip archives for batch conversions.
+
+:class:`ZipStream` writes a zip archive to a write-only sink and hands the
+bytes out as soon as they are produced. The sink cannot seek, so ``zipfile``
+follows every entry with a data descriptor instead of rewriting its header,
+and a response built on it holds at most one chunk of the archive in memory
+and none of it on disk.
+"""
+import asyncio
+import zipfile
+from pathlib import Path
+
+
+class _Sink:
+    """Non-seekable file object collecting what ``zipfile`` writes."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """Incrementally built zip archive.
+
+    Add entries with :meth:`add_file` (an async generator of archive bytes)
+    or :meth:`add_bytes`, then emit the central directory with :meth:`close`.
+    Compression runs in a thread so the event loop stays responsive.
+    """
+
+    def __init__(self, chunk_size: int = 1024 * 1024, compression: int = zipfile.ZIP_DEFLATED):
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self._sink = _Sink()
+        self._archive = zipfile.ZipFile(self._sink, "w", compression=compression)
+        self._names: set[str] = set()
+
+    def unique_name(self, name: str) -> str:
+        """Return ``name``, suffixed with `` (2)``, `` (3)``... if already used."""
+        candidate = name
+        n = 2
+        while candidate in self._names:
+            path = Path(name)
+            candidate = f"{path.stem} ({n}){path.suffix}"
+            n += 1
+        self._names.add(candidate)
+        return candidate
+
+    async def add_file(self, path: Path, arcname: str):
+        """Compress ``path`` into the entry ``arcname``, yielding archive bytes as they are produced."""
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        info.compress_type = self.compression
+        self._names.add(arcname)
+        with path.open("rb") as src, self._archive.open(info, "w") as dest:
+            while True:
+                chunk = await asyncio.to_thread(src.read, self.chunk_size)
+                if not chunk:
+                    break
+                await asyncio.to_thread(dest.write, chunk)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        # Closing the entry flushes the compressor and writes the data descriptor
+        yield self._sink.drain()
+
+    def add_bytes(self, arcname: str, data: bytes) -> bytes:
+        """Add a small in-memory entry and return the archive bytes for it."""
+        self._names.add(arcname)
+        self._archive.writestr(arcname, data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Finish the archive and return the central directory."""
+        self._archive.close()
+        return self._sink.drain()
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache of converted files on local disk.
+
+Entries are keyed by the SHA-256 of the uploaded bytes, the target file
+version and the rhino3dm version that produced the output, so a rhino3dm
+upgrade never serves stale conversions. The cache is bounded by total size
+and evicts least recently used entries first.
+
+Every method does blocking file I/O, so the service calls them through
+``asyncio.to_thread``; the LRU bookkeeping, renames and evictions are
+guarded by a lock, and copying file contents happens outside it.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+
+def cache_key(input_sha256: str, target_version: int, rhino3dm_version: str) -> str:
+    return hashlib.sha256(f"{input_sha256}:{target_version}:{rhino3dm_version}".encode()).hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ConversionCache:
+    """Size-bounded LRU of converted files stored under ``directory``."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.3dm"
+
+    def _load(self):
+        # Rebuild the LRU order from what a previous process left on disk
+        found = []
+        for path in self.directory.glob("*/*.3dm"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            found.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+        self._evict()
+
+    def get(self, key: str, dest: Path) -> bool:
+        """Place the cached output for ``key`` at ``dest``; return False on a miss."""
+        path = self._lookup(key)
+        if path is None:
+            return False
+        try:
+            _link_or_copy(path, dest)
+            os.utime(path)
+        except OSError:
+            # Removed behind our back (or just evicted); forget it and treat as a miss
+            self._forget(key)
+            return False
+        self._touch(key)
+        return True
+
+    def read(self, key: str) -> bytes | None:
+        """Return the cached output for ``key`` as bytes, or None on a miss."""
+        path = self._lookup(key)
+        if path is None:
+            return None
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            self._forget(key)
+            return None
+        self._touch(key)
+        return data
+
+    def put(self, key: str, src: Path):
+        """Store a copy of ``src`` under ``key``, evicting old entries to fit."""
+        if not self.enabled or key in self._entries:
+            return
+        size = src.stat().st_size
+        if size > self.max_bytes:
+            return
+        self._store(key, size, lambda tmp: _link_or_copy(src, tmp))
+
+    def put_bytes(self, key: str, data: bytes):
+        """Store ``data`` under ``key``, evicting old entries to fit."""
+        if not self.enabled or key in self._entries or len(data) > self.max_bytes:
+            return
+        self._store(key, len(data), lambda tmp: tmp.write_bytes(data))
+
+    def _lookup(self, key: str) -> Path | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+        return self._path(key)
+
+    def _touch(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._drop(key)
+            self.misses += 1
+
+    def _store(self, key: str, size: int, write):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per call, as two requests may store the same key at once
+        tmp = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp)
+            # Renaming under the lock keeps the files on disk in step with the entries
+            with self._lock:
+                if key in self._entries:
+                    tmp.unlink()
+                    return
+                os.replace(tmp, path)
+                self._entries[key] = size
+                self._total += size
+                self._evict()
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def _drop(self, key: str):
+        size = self._entries.pop(key, 0)
+        self._total -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._total,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,199 @@
+"""
+Compressed uploads and compressed results.
+
+.3dm files compress well, so clients on slow links may send them gzip or
+zstd compressed and ask for compressed results with ``Accept-Encoding``.
+Compressed input is recognised by its magic bytes rather than its name or
+headers, and :class:`StreamDecoder` inflates it chunk by chunk as it
+arrives, never holding more than a bounded slice of the decompressed file
+in memory. zstd needs the optional ``zstandard`` package; without it only
+gzip is offered and zstd uploads are refused.
+"""
+import gzip
+import os
+import shutil
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# zstd has no output bound per call, so input is fed in slices this small:
+# even a maximally compressed slice inflates to a few tens of MB at most
+_ZSTD_SLICE = 1024
+
+
+class DecodeError(Exception):
+    """Raised for compressed input that is corrupt, truncated or cannot be decoded here."""
+
+
+class DecodedTooLarge(DecodeError):
+    """Raised when compressed input inflates past the allowed size."""
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this server can read and write, most preferred first."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def sniff_encoding(head: bytes) -> str | None:
+    """Return ``"gzip"`` or ``"zstd"`` if ``head`` starts a compressed stream, else None."""
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def strip_encoding_suffix(filename: str) -> str:
+    """``model.3dm.gz`` -> ``model.3dm``; other names are returned unchanged."""
+    lower = filename.lower()
+    for suffix in (".gz", ".zst", ".zstd"):
+        if lower.endswith(".3dm" + suffix):
+            return filename[: -len(suffix)]
+    return filename
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Pick the response encoding for an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = [token.strip() for token in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in supported_encodings():
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class StreamDecoder:
+    """Incremental decoder for a gzip or zstd stream.
+
+    Feed compressed data to :meth:`decode`, which yields decompressed chunks
+    (at most ``chunk_size`` bytes each for gzip), then call :meth:`finish`
+    to check the stream was complete. Concatenated gzip members and zstd
+    frames are decoded in turn, as ``gzip -d`` and ``zstd -d`` do.
+    """
+
+    def __init__(self, encoding: str, chunk_size: int = 1024 * 1024):
+        if encoding == "zstd" and zstandard is None:
+            raise DecodeError("zstd input is not supported on this server, send it gzip compressed or uncompressed")
+        if encoding not in SUFFIXES:
+            raise DecodeError(f"Unsupported encoding: {encoding}")
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self._decoder = self._new_decoder()
+        self._started = False
+
+    def _new_decoder(self):
+        if self.encoding == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def decode(self, data: bytes) -> Iterator[bytes]:
+        try:
+            while data:
+                if self._decoder.eof:
+                    # Next gzip member or zstd frame
+                    self._decoder = self._new_decoder()
+                self._started = True
+                if self.encoding == "gzip":
+                    yield from self._decode_gzip(data)
+                    data = self._decoder.unused_data
+                else:
+                    data = yield from self._decode_zstd(data)
+        except (zlib.error, getattr(zstandard, "ZstdError", zlib.error)) as e:
+            raise DecodeError(f"Invalid {self.encoding} data: {e}")
+
+    def _decode_gzip(self, data: bytes) -> Iterator[bytes]:
+        while True:
+            out = self._decoder.decompress(data, self.chunk_size)
+            if out:
+                yield out
+            data = self._decoder.unconsumed_tail
+            # A full chunk may leave output pending even when all input was consumed
+            if self._decoder.eof or (not data and len(out) < self.chunk_size):
+                return
+
+    def _decode_zstd(self, data: bytes):
+        for offset in range(0, len(data), _ZSTD_SLICE):
+            out = self._decoder.decompress(data[offset:offset + _ZSTD_SLICE])
+            if out:
+                yield out
+            if self._decoder.eof:
+                return self._decoder.unused_data + data[offset + _ZSTD_SLICE:]
+        return b""
+
+    def finish(self):
+        """Raise :class:`DecodeError` if the stream ended mid-member or mid-frame."""
+        if self._started and not self._decoder.eof:
+            raise DecodeError(f"Truncated {self.encoding} data")
+
+
+def decode_file(src: Path, dest: Path, encoding: str, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """Decompress ``src`` into ``dest`` and return the decompressed size.
+
+    Raises :class:`DecodedTooLarge` as soon as the output passes ``max_bytes``.
+    """
+    decoder = StreamDecoder(encoding, chunk_size)
+    total = 0
+    with src.open("rb") as f_in, dest.open("wb") as f_out:
+        while True:
+            chunk = f_in.read(chunk_size)
+            if not chunk:
+                break
+            for data in decoder.decode(chunk):
+                total += len(data)
+                if total > max_bytes:
+                    raise DecodedTooLarge(f"Decompressed size is over {max_bytes // (1024 * 1024)} MB")
+                f_out.write(data)
+    decoder.finish()
+    return total
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_file(src: Path, encoding: str) -> Path:
+    """Write a compressed copy of ``src`` next to it and return its path.
+
+    An existing copy is reused; a new one only appears once complete, so
+    concurrent callers never see a partial file.
+    """
+    dest = src.with_name(src.name + SUFFIXES[encoding])
+    if dest.exists():
+        return dest
+    part = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.part")
+    with src.open("rb") as f_in, part.open("wb") as f_out:
+        if encoding == "zstd":
+            zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(f_in, f_out)
+        else:
+            with gzip.GzipFile(fileobj=f_out, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(f_in, gz, 1024 * 1024)
+    os.replace(part, dest)
+    return dest
@@ -0,0 +1,224 @@
+"""
+Process-pool conversion engine for the converter service.
+
+rhino3dm reads and writes models synchronously, so calling ``convert_file``
+inside an ``async def`` handler blocks the event loop for the whole
+conversion. The engine runs conversions in worker processes instead and keeps
+a bounded admission count so an overloaded instance answers 503 quickly
+rather than queueing work it cannot finish.
+
+rhino3dm holds the whole model in native memory, so admission can also be
+bounded by memory: callers pass an estimate of what a conversion needs and
+the engine keeps the sum of admitted estimates under a budget. Each worker
+can be given an address-space limit, so a runaway conversion fails with
+MemoryError in its own process instead of getting the whole instance
+OOM-killed. Workers can also be replaced after a number of conversions, so
+native heap fragmentation doesn't build up.
+
+Workers come from the converter's :class:`WorkerPool`, so a conversion that
+runs past the engine's timeout has its worker killed and fails with
+:class:`ConversionTimeout`, and a crashed worker only fails its own task.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+converter_dir = Path(__file__).resolve().parents[1] / "3dm_version_converter"
+if str(converter_dir) not in sys.path:
+    sys.path.insert(0, str(converter_dir))
+
+from workers import WorkerPool
+
+
+class EngineSaturated(Exception):
+    """Raised when the engine has no room for another conversion."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Conversion engine is saturated")
+        self.retry_after = retry_after
+
+
+class ConversionTooLarge(Exception):
+    """Raised when a conversion's memory estimate exceeds what any worker may use."""
+
+    def __init__(self, estimate: int, limit: int):
+        super().__init__(f"Conversion needs about {estimate // 2**20} MB, limit is {limit // 2**20} MB")
+        self.estimate = estimate
+        self.limit = limit
+
+
+class ConversionEngine:
+    """Run blocking conversion calls in a pool of worker processes.
+
+    ``workers`` conversions run in parallel and up to ``queue_size`` more may
+    wait for a free worker. Anything beyond that is rejected with
+    :class:`EngineSaturated`, unless the caller asks to wait for room.
+
+    With ``memory_budget`` (bytes), the memory estimates of all admitted
+    conversions must also fit the budget. ``worker_memory_limit`` caps each
+    worker's address space where the platform supports it. Estimates above
+    either limit are rejected with :class:`ConversionTooLarge`.
+    ``max_tasks_per_worker`` replaces a worker process after that many
+    conversions. A conversion running longer than ``timeout`` seconds is
+    killed and raises :class:`ConversionTimeout`.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        queue_size: int | None = None,
+        retry_after: int = 5,
+        memory_budget: int = 0,
+        worker_memory_limit: int = 0,
+        max_tasks_per_worker: int = 0,
+        timeout: float = 0,
+    ):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_size = self.workers * 2 if queue_size is None else max(0, queue_size)
+        self.retry_after = retry_after
+        self.memory_budget = max(0, memory_budget)
+        self.worker_memory_limit = max(0, worker_memory_limit)
+        self.max_tasks_per_worker = max(0, max_tasks_per_worker)
+        self.timeout = max(0, timeout)
+        self._pool: WorkerPool | None = None
+        self._admitted = 0
+        self._reserved = 0
+        self._waiters: list[asyncio.Future] = []
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._admitted, self.workers)
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._admitted - self.workers)
+
+    @property
+    def memory_reserved(self) -> int:
+        return self._reserved
+
+    @property
+    def memory_limit(self) -> int:
+        """Largest estimate a single conversion may have (0 = unlimited)."""
+        limits = [limit for limit in (self.memory_budget, self.worker_memory_limit) if limit]
+        return min(limits) if limits else 0
+
+    def start(self):
+        if self._pool is None:
+            # Workers are spawned, which keeps them independent of the server's
+            # threads and event loop and behaves the same on every platform.
+            self._pool = WorkerPool(
+                self.workers,
+                timeout=self.timeout or None,
+                initializer=_init_worker,
+                initargs=(self.worker_memory_limit,),
+                max_tasks_per_worker=self.max_tasks_per_worker or None,
+            )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, kill=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queueSize": self.queue_size,
+            "inFlight": self.in_flight,
+            "queued": self.queued,
+            "waiting": len(self._waiters),
+            "memoryBudget": self.memory_budget,
+            "memoryReserved": self._reserved,
+            "workerMemoryLimit": self.worker_memory_limit,
+            "timeout": self.timeout,
+        }
+
+    def _has_room(self, memory: int) -> bool:
+        if self._admitted >= self.capacity:
+            return False
+        return not (self.memory_budget and self._reserved + memory > self.memory_budget)
+
+    async def _wait_for_room(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    async def run(self, fn, *args, memory: int = 0, wait: bool = False):
+        """Run ``fn(*args)`` in a worker process and return its result.
+
+        ``memory`` is the caller's estimate of the bytes the conversion needs;
+        it is reserved against the memory budget until the worker finishes.
+        Admission is released when the worker finishes, not when the caller
+        stops waiting, so a disconnected client cannot free a slot that is
+        still busy. With ``wait`` a saturated engine is waited out instead of
+        raising :class:`EngineSaturated`, for background work with no client
+        to send a 503 to.
+        """
+        limit = self.memory_limit
+        if memory and limit and memory > limit:
+            raise ConversionTooLarge(memory, limit)
+        while not self._has_room(memory):
+            if not wait:
+                raise EngineSaturated(self.retry_after)
+            await self._wait_for_room()
+        self.start()
+
+        loop = asyncio.get_running_loop()
+        self._admitted += 1
+        self._reserved += memory
+        future = self._pool.submit(fn, *args)
+
+        def _release(_):
+            loop.call_soon_threadsafe(self._release, memory)
+
+        # A worker that dies (e.g. killed by the OOM killer) or runs past the
+        # timeout fails this future with WorkerCrashed / ConversionTimeout and
+        # is replaced; other conversions keep running.
+        future.add_done_callback(_release)
+        return await asyncio.wrap_future(future)
+
+    async def run_timed(self, fn, *args, memory: int = 0, wait: bool = False):
+        """Like :meth:`run` for functions taking a ``timings`` dict.
+
+        Returns ``(result, timings)`` with whatever stage durations ``fn``
+        recorded in the worker process.
+        """
+        return await self.run(_call_timed, fn, args, memory=memory, wait=wait)
+
+    def _release(self, memory: int = 0):
+        self._admitted -= 1
+        self._reserved -= memory
+        # Every waiter checks again; those that still don't fit go back to waiting
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+def _init_worker(memory_limit: int):
+    # Runs once in each new worker process
+    if not memory_limit:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows: no rlimits
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def _call_timed(fn, args):
+    # Runs in the worker; the timings dict travels back with the result
+    timings = {}
+    return fn(*args, timings=timings), timings
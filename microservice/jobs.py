@@ -0,0 +1,138 @@
+"""
+Background conversion jobs for the converter service.
+
+A job is submitted, converted by one of a fixed number of queue workers and
+kept until ``ttl`` seconds after it finished, so clients can poll its status
+and download the result over short requests instead of holding a single
+connection open for the whole conversion.
+"""
+import asyncio
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+class JobQueueFull(Exception):
+    """Raised when no more jobs can be queued."""
+
+
+class Job:
+    def __init__(self, params: dict):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.tmpdir: Path | None = None
+        self.output_path: Path | None = None
+        self.result: dict | None = None
+        self.timings: dict = {}
+        # X-Conversion-Cache value of the finished conversion
+        self.cache_status: str | None = None
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        queued_until = self.started_at or self.finished_at or now
+        data = {
+            "jobId": self.id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "queuedSeconds": round(queued_until - self.created_at, 3),
+            "runSeconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+        }
+        if self.cache_status:
+            data["cache"] = self.cache_status
+        if self.timings:
+            data["timings"] = {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        if self.error:
+            data["error"] = self.error
+        if self.output_path:
+            data["filename"] = self.output_path.name
+        if self.result:
+            data["result"] = self.result
+        return data
+
+    def cleanup(self):
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class JobManager:
+    """Queue of :class:`Job` objects processed by ``workers`` asyncio tasks.
+
+    ``handler`` is an ``async`` callable that receives the job, does the work
+    (recording stage durations in ``job.timings``) and sets ``job.output_path`` (and optionally ``job.tmpdir`` for cleanup,
+    or ``job.result`` when the output was delivered elsewhere).
+    Any exception marks the job failed; an exception's ``detail`` attribute
+    is preferred over ``str()`` for the error message.
+    """
+
+    def __init__(self, handler, workers: int = 1, max_queued: int = 100, ttl: int = 3600):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            job.cleanup()
+        self._jobs.clear()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, **params) -> Job:
+        if self.queued >= self.max_queued:
+            raise JobQueueFull()
+        job = Job(params)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self.handler(job)
+                job.status = "done"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(getattr(e, "detail", None) or e)
+                job.cleanup()
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(min(60, self.ttl))
+            cutoff = time.time() - self.ttl
+            for job_id, job in list(self._jobs.items()):
+                if job.finished_at and job.finished_at < cutoff:
+                    job.cleanup()
+                    del self._jobs[job_id]
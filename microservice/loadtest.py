@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Load test for the converter service.
+
+Boots ``microservice.app:app`` under uvicorn against a local moto S3 server,
+then replays a mix of ``/convert`` and ``/convert-by-key`` requests at
+increasing concurrency and reports latency percentiles, throughput and error
+rate per level as JSON. Requires ``pip install httpx "moto[server]"``.
+
+    python microservice/loadtest.py --concurrency 1,4,16 --requests 200
+    python microservice/loadtest.py --url https://staging.example.com --by-key-ratio 0
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import click
+
+repo_root = Path(__file__).resolve().parents[1]
+converter_dir = repo_root / "3dm_version_converter"
+if str(converter_dir) not in sys.path:
+    sys.path.insert(0, str(converter_dir))
+
+BUCKET = "loadtest"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _make_fixtures(scales, directory: Path) -> list[tuple[str, bytes]]:
+    from benchmark import build_fixture
+
+    fixtures = []
+    for scale in scales:
+        path = directory / f"load_x{scale}.3dm"
+        build_fixture(path, scale)
+        fixtures.append((path.name, path.read_bytes()))
+    return fixtures
+
+
+def _start_moto():
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise click.ClickException('moto is required for the local S3 stand-in: pip install "moto[server]"')
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _start_service(env: dict, workers: int):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "microservice.app:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=repo_root,
+        env=env,
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def _wait_healthy(client, url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{url}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise click.ClickException(f"Service at {url} did not become healthy")
+
+
+def _percentile(cuts, p):
+    return round(cuts[p - 1] * 1000, 1) if cuts else None
+
+
+async def _run_level(client, url, s3, fixtures, versions, by_key_ratio, concurrency, total, seed) -> dict:
+    rng = random.Random(seed)
+    plan = [
+        (rng.choice(fixtures), rng.choice(versions), rng.random() < by_key_ratio)
+        for _ in range(total)
+    ]
+    samples = []
+    next_index = 0
+
+    async def one(fixture, version, by_key):
+        name, data = fixture
+        if by_key:
+            # Staging the object is client work; only the service call is timed
+            key = f"uploads/{uuid.uuid4().hex}/{name}"
+            await asyncio.to_thread(s3.put_object, Bucket=BUCKET, Key=key, Body=data)
+            start = time.perf_counter()
+            resp = await client.post(f"{url}/convert-by-key", data={"key": key, "targetVersion": version})
+        else:
+            start = time.perf_counter()
+            resp = await client.post(f"{url}/convert", files={"file": (name, data)}, data={"targetVersion": version})
+        await resp.aread()
+        return time.perf_counter() - start, resp.status_code, "convert-by-key" if by_key else "convert"
+
+    async def worker():
+        nonlocal next_index
+        while next_index < len(plan):
+            fixture, version, by_key = plan[next_index]
+            next_index += 1
+            try:
+                samples.append(await one(fixture, version, by_key))
+            except Exception as e:
+                samples.append((None, type(e).__name__, "convert-by-key" if by_key else "convert"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = [latency for latency, status, _ in samples if status == 200]
+    statuses: dict[str, int] = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    cuts = statistics.quantiles(ok, n=100, method="inclusive") if len(ok) >= 2 else []
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "seconds": round(elapsed, 3),
+        "throughputRps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "errorRate": round(1 - len(ok) / len(samples), 4) if samples else None,
+        "p50Ms": _percentile(cuts, 50),
+        "p95Ms": _percentile(cuts, 95),
+        "p99Ms": _percentile(cuts, 99),
+        "statuses": statuses,
+        "byKeyRequests": sum(1 for *_, endpoint in samples if endpoint == "convert-by-key"),
+    }
+
+
+async def _main(opts) -> dict:
+    try:
+        import boto3
+        import httpx
+    except ImportError:
+        raise click.ClickException("httpx and boto3 are required: pip install httpx boto3")
+
+    scales = [int(s) for s in opts["sizes"].split(",") if s.strip()]
+    levels = [int(c) for c in opts["concurrency"].split(",") if c.strip()]
+    versions = [v.strip() for v in opts["versions"].split(",") if v.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="3dm-load-") as tmp:
+        fixtures = _make_fixtures(scales, Path(tmp))
+
+        moto = proc = s3 = None
+        url = opts["url"]
+        try:
+            if opts["by_key_ratio"] > 0:
+                if url and not opts["s3_endpoint"]:
+                    raise click.ClickException("--s3-endpoint is required for /convert-by-key against --url")
+                endpoint = opts["s3_endpoint"]
+                if not endpoint:
+                    moto, endpoint = _start_moto()
+                s3 = boto3.client(
+                    "s3", region_name="us-east-1", endpoint_url=endpoint,
+                    aws_access_key_id="loadtest", aws_secret_access_key="loadtest",
+                )
+                if moto:
+                    s3.create_bucket(Bucket=BUCKET)
+
+            if not url:
+                env = {
+                    **os.environ,
+                    "AWS_REGION": "us-east-1",
+                    "AWS_ACCESS_KEY_ID": "loadtest",
+                    "AWS_SECRET_ACCESS_KEY": "loadtest",
+                    "S3_BUCKET": BUCKET,
+                    # Measure conversions, not cache hits or identical
+                    # fixtures sharing one conversion
+                    "CACHE_MAX_MB": "0",
+                    "COALESCE_CONVERSIONS": "0",
+                }
+                if s3:
+                    env["S3_ENDPOINT_URL"] = s3.meta.endpoint_url
+                proc, url = _start_service(env, opts["service_workers"])
+
+            timeout = httpx.Timeout(opts["timeout"])
+            limits = httpx.Limits(max_connections=max(levels))
+            async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+                await _wait_healthy(client, url)
+                results = []
+                for concurrency in levels:
+                    result = await _run_level(
+                        client, url, s3, fixtures, versions, opts["by_key_ratio"],
+                        concurrency, opts["requests"], opts["seed"],
+                    )
+                    click.echo(
+                        f"c={concurrency:<4} p50={result['p50Ms']}ms p95={result['p95Ms']}ms "
+                        f"p99={result['p99Ms']}ms {result['throughputRps']} req/s errors={result['errorRate']:.1%}",
+                        err=True,
+                    )
+                    results.append(result)
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait(timeout=30)
+            if moto:
+                moto.stop()
+
+    return {
+        "url": url,
+        "fixtures": [{"name": name, "bytes": len(data)} for name, data in fixtures],
+        "versions": versions,
+        "byKeyRatio": opts["by_key_ratio"],
+        "levels": results,
+    }
+
+
+@click.command()
+@click.option('--url', help='Target an already running service instead of booting one locally')
+@click.option('--s3-endpoint', help='S3 endpoint used by the target service (default: a local moto server)')
+@click.option('--concurrency', default='1,2,4,8,16', show_default=True, help='Comma-separated concurrency levels, run in order')
+@click.option('--requests', '-n', default=100, show_default=True, type=click.IntRange(min=1), help='Requests per level')
+@click.option('--sizes', default='1,4,16', show_default=True, help='Fixture scales (see benchmark.py suite)')
+@click.option('--versions', default='5,6,7', show_default=True, help='Target versions to pick from')
+@click.option('--by-key-ratio', default=0.3, show_default=True, type=click.FloatRange(0, 1),
+              help='Share of requests sent to /convert-by-key instead of /convert')
+@click.option('--service-workers', default=1, show_default=True, help='uvicorn --workers for the booted service')
+@click.option('--timeout', default=300.0, show_default=True, help='Per-request timeout in seconds')
+@click.option('--seed', default=0, show_default=True, help='Seed for the request mix')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write JSON here instead of stdout')
+def main(output, **opts):
+    """Measure latency and throughput of the converter service under load."""
+    report = asyncio.run(_main(opts))
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text)
+    else:
+        click.echo(text)
+
+
+if __name__ == "__main__":
+    main()
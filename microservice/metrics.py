@@ -0,0 +1,120 @@
+"""
+Prometheus metrics for the converter service.
+
+Stage durations and byte sizes are recorded per request; engine, job queue,
+upload and cache state is read at scrape time by :class:`ServiceCollector`. Each
+uvicorn process keeps its own registry, so scrape every instance.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+_MB = 1024 * 1024
+SIZE_BUCKETS = (64 * 1024, 256 * 1024, _MB, 5 * _MB, 20 * _MB, 50 * _MB, 100 * _MB, 250 * _MB, 500 * _MB)
+
+STAGE_SECONDS = Histogram(
+    "converter_stage_seconds",
+    "Time spent per conversion stage (receive, download, hash, decode, cache, coalesce, read, write, zip, compress, upload, respond)",
+    ["stage", "target_version"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+INPUT_BYTES = Histogram(
+    "converter_input_bytes",
+    "Size of files submitted for conversion",
+    ["target_version"],
+    buckets=SIZE_BUCKETS,
+)
+OUTPUT_BYTES = Histogram(
+    "converter_output_bytes",
+    "Size of converted files",
+    ["target_version"],
+    buckets=SIZE_BUCKETS,
+)
+COPIED = Counter(
+    "converter_copied_through",
+    "Outputs returned unconverted because the input already met the target version",
+    ["target_version"],
+)
+COALESCED = Counter(
+    "converter_coalesced",
+    "Outputs taken from an identical conversion another request was already running",
+    ["target_version"],
+)
+ERRORS = Counter(
+    "converter_errors_total",
+    "Failed requests by failure type",
+    ["reason"],
+)
+
+# HTTP status of a failed request -> failure type label
+_REASONS = {
+    400: "invalid_request",
+    404: "not_found",
+    409: "not_ready",
+    413: "too_large",
+    415: "unsupported_media",
+    500: "conversion_failed",
+    503: "saturated",
+    504: "timeout",
+}
+
+
+def record_error(status_code: int | None = None, reason: str | None = None):
+    ERRORS.labels(reason or _REASONS.get(status_code, f"http_{status_code}")).inc()
+
+
+def observe(target_version: int | str, timings: dict, input_bytes: int | None = None, output_bytes: int | None = None):
+    """Record the stage durations and sizes of one conversion request.
+
+    Requests for several target versions are recorded under ``multi``.
+    """
+    version = str(target_version)
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(stage, version).observe(seconds)
+    if input_bytes is not None:
+        INPUT_BYTES.labels(version).observe(input_bytes)
+    if output_bytes is not None:
+        OUTPUT_BYTES.labels(version).observe(output_bytes)
+
+
+class ServiceCollector:
+    """Expose engine, job queue, upload and cache state at scrape time."""
+
+    def __init__(self, engine, jobs, cache, uploads, shared_cache):
+        self.engine = engine
+        self.jobs = jobs
+        self.cache = cache
+        self.uploads = uploads
+        self.shared_cache = shared_cache
+
+    def collect(self):
+        yield GaugeMetricFamily("converter_engine_workers", "Conversion worker processes", value=self.engine.workers)
+        yield GaugeMetricFamily("converter_in_flight", "Conversions currently running", value=self.engine.in_flight)
+        yield GaugeMetricFamily("converter_queue_depth", "Conversions waiting for a worker", value=self.engine.queued)
+        yield GaugeMetricFamily(
+            "converter_memory_reserved_bytes",
+            "Estimated memory of running and queued conversions",
+            value=self.engine.memory_reserved,
+        )
+        yield GaugeMetricFamily("converter_jobs_queued", "Background jobs waiting to start", value=self.jobs.queued)
+        yield GaugeMetricFamily("converter_uploads_active", "Resumable uploads in progress", value=self.uploads.active)
+
+        stats = self.cache.stats()
+        yield GaugeMetricFamily("converter_cache_bytes", "Bytes held in the conversion cache", value=stats["bytes"])
+        yield CounterMetricFamily("converter_cache_hits", "Conversion cache hits", value=stats["hits"])
+        yield CounterMetricFamily("converter_cache_misses", "Conversion cache misses", value=stats["misses"])
+        yield CounterMetricFamily("converter_cache_evictions", "Conversion cache evictions", value=stats["evictions"])
+
+        shared = self.shared_cache.stats()
+        yield CounterMetricFamily("converter_shared_cache_hits", "Shared (S3) cache hits", value=shared["hits"])
+        yield CounterMetricFamily("converter_shared_cache_misses", "Shared (S3) cache misses", value=shared["misses"])
+        yield CounterMetricFamily("converter_shared_cache_stores", "Outputs stored in the shared cache", value=shared["stores"])
+        yield CounterMetricFamily("converter_shared_cache_errors", "Failed shared cache requests", value=shared["errors"])
+
+
+def register(engine, jobs, cache, uploads, shared_cache):
+    REGISTRY.register(ServiceCollector(engine, jobs, cache, uploads, shared_cache))
+
+
+def render() -> tuple[bytes, str]:
+    """Return the exposition payload and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,204 @@
+"""
+Conversion cache shared by every instance of the service, stored in S3.
+
+Outputs live at ``<prefix>/<key[:2]>/<key>.3dm`` in the service's bucket,
+keyed like :class:`cache.ConversionCache` (input SHA-256, target version
+and rhino3dm version), so one instance can serve a conversion that another
+one did. An in-process LRU index remembers keys known to exist for ``ttl``
+seconds so repeated hits skip the HEAD request. S3 is the source of truth:
+expiry is left to a bucket lifecycle rule, and an indexed key that has
+vanished is simply a miss. S3 errors never fail a request, they count as
+misses.
+"""
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+
+class SharedCache:
+    """Converted files in ``bucket`` under ``prefix``, with an index of ``index_size`` known keys.
+
+    Stores run in the background on ``upload_workers`` threads from a copy
+    staged in ``staging_dir``, so a conversion is never held up by them.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        prefix: str,
+        staging_dir: Path,
+        index_size: int = 10000,
+        ttl: int = 3600,
+        transfer_config=None,
+        upload_workers: int = 4,
+    ):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.staging_dir = Path(staging_dir)
+        self.index_size = index_size
+        self.ttl = ttl
+        self.transfer_config = transfer_config
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self._index: "OrderedDict[str, float]" = OrderedDict()
+        # Lookups run on request threads and stores on the executor's
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        if self.enabled:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            self._executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="shared-cache")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.s3 and self.bucket and self.prefix)
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key[:2]}/{key}.3dm"
+
+    def _remember(self, key: str):
+        with self._lock:
+            self._index[key] = time.monotonic() + self.ttl
+            self._index.move_to_end(key)
+            while len(self._index) > self.index_size:
+                self._index.popitem(last=False)
+
+    def _known(self, key: str) -> bool:
+        with self._lock:
+            expires = self._index.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._index[key]
+                return False
+            self._index.move_to_end(key)
+            return True
+
+    def contains(self, key: str) -> bool:
+        """True if ``key`` is in the cache, asking S3 only when the index doesn't know."""
+        if not self.enabled:
+            return False
+        if self._known(key):
+            return True
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except (ClientError, BotoCoreError):
+            return False
+        self._remember(key)
+        return True
+
+    def get(self, key: str, dest: Path) -> bool:
+        """Download the cached output for ``key`` to ``dest``; return False on a miss."""
+        if not self.enabled:
+            return False
+        try:
+            self.s3.download_file(self.bucket, self.object_key(key), str(dest), Config=self.transfer_config)
+        except (ClientError, BotoCoreError) as e:
+            self._miss(key, e)
+            dest.unlink(missing_ok=True)
+            return False
+        self.hits += 1
+        self._remember(key)
+        return True
+
+    def read(self, key: str) -> bytes | None:
+        """Return the cached output for ``key`` as bytes, or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            data = self.s3.get_object(Bucket=self.bucket, Key=self.object_key(key))["Body"].read()
+        except (ClientError, BotoCoreError) as e:
+            self._miss(key, e)
+            return None
+        self.hits += 1
+        self._remember(key)
+        return data
+
+    def copy_to(self, key: str, dest_key: str, extra_args: dict | None = None) -> bool:
+        """Server-side copy the cached output for ``key`` to ``dest_key`` in the same bucket."""
+        if not self.enabled:
+            return False
+        try:
+            self.s3.copy(
+                {"Bucket": self.bucket, "Key": self.object_key(key)},
+                self.bucket,
+                dest_key,
+                ExtraArgs={"MetadataDirective": "REPLACE", **(extra_args or {})},
+                Config=self.transfer_config,
+            )
+        except (ClientError, BotoCoreError) as e:
+            self._miss(key, e)
+            return False
+        self.hits += 1
+        self._remember(key)
+        return True
+
+    def _miss(self, key: str, error: Exception):
+        with self._lock:
+            self._index.pop(key, None)
+        self.misses += 1
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        if code not in ("404", "NoSuchKey", "NotFound"):
+            self.errors += 1
+
+    def put(self, key: str, src: Path):
+        """Store a copy of ``src`` under ``key`` in the background."""
+        if not self.enabled or self._known(key):
+            return
+        staged = self.staging_dir / f"{uuid.uuid4().hex}.3dm"
+        try:
+            os.link(src, staged)
+        except OSError:
+            shutil.copyfile(src, staged)
+        self._executor.submit(self._upload, key, staged)
+
+    def put_bytes(self, key: str, data: bytes):
+        """Store ``data`` under ``key`` in the background."""
+        if not self.enabled or self._known(key):
+            return
+        staged = self.staging_dir / f"{uuid.uuid4().hex}.3dm"
+        staged.write_bytes(data)
+        self._executor.submit(self._upload, key, staged)
+
+    def _upload(self, key: str, staged: Path):
+        try:
+            self.s3.upload_file(
+                str(staged),
+                self.bucket,
+                self.object_key(key),
+                ExtraArgs={"ContentType": "application/octet-stream"},
+                Config=self.transfer_config,
+            )
+            self.stores += 1
+            self._remember(key)
+        except (ClientError, BotoCoreError):
+            self.errors += 1
+        finally:
+            staged.unlink(missing_ok=True)
+
+    def shutdown(self):
+        """Wait for background stores to finish."""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "bucket": self.bucket if self.enabled else None,
+            "prefix": self.prefix,
+            "indexed": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
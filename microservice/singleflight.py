@@ -0,0 +1,83 @@
+"""
+Coalescing of identical conversions that run at the same time.
+
+When a class uploads the same starter model for the same version within
+seconds, only the first request converts it; the others attach to that
+conversion and reuse its output. Flights are keyed by conversion cache key
+(input SHA-256, target version, rhino3dm version), so this works whether or
+not the cache is enabled, but only within one process.
+
+The leader registers a key with :meth:`SingleFlight.lead` and settles it
+with :meth:`SingleFlight.land`; followers get the leader's future from
+:meth:`SingleFlight.follow`. A leader that fails passes its exception on,
+since the same input would fail the same way. A leader that is cancelled
+passes nothing on: :meth:`SingleFlight.wait` returns None and the follower
+converts the file itself. A disabled :class:`SingleFlight` never has
+anything in flight, so every caller converts on its own.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: dict[str, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def follow(self, key: str) -> asyncio.Future | None:
+        """Return the future of the conversion running for ``key``, or None if there is none."""
+        return self._flights.get(key)
+
+    def lead(self, key: str) -> asyncio.Future:
+        """Register the caller as converting ``key``; it must call :meth:`land` when done."""
+        flight = asyncio.get_running_loop().create_future()
+        if self.enabled:
+            self._flights[key] = flight
+        return flight
+
+    def land(self, key: str, result=None, error: BaseException | None = None):
+        """Settle the flight for ``key`` with ``result`` or ``error`` and unregister it.
+
+        A :class:`asyncio.CancelledError` as ``error`` cancels the flight.
+        """
+        flight = self._flights.pop(key, None)
+        if flight is None or flight.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            flight.cancel()
+        elif error is not None:
+            flight.set_exception(error)
+            # Followers are optional, so don't warn about an exception nobody awaited
+            flight.exception()
+        else:
+            flight.set_result(result)
+
+    async def wait(self, flight: asyncio.Future):
+        """Wait for a followed flight: its result, its exception raised, or None if it was cancelled."""
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if flight.cancelled():
+                return None
+            raise
+
+    async def do(self, key: str, fn):
+        """Run ``await fn()`` as the conversion for ``key``, or wait for the one already running.
+
+        Returns ``(result, coalesced)``.
+        """
+        while (flight := self.follow(key)) is not None:
+            result = await self.wait(flight)
+            if result is not None:
+                return result, True
+        self.lead(key)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.land(key, error=e)
+            raise
+        self.land(key, result)
+        return result, False
@@ -0,0 +1,136 @@
+import io
+import os
+import socket
+import tempfile
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import converter as conv
+
+
+BUCKET = "test-uploads"
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """A moto S3 stand-in with ``BUCKET``, or None when moto is not installed."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        yield None
+        return
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory, s3_endpoint):
+    fastapi_testclient = pytest.importorskip("fastapi.testclient")
+    # The service reads its settings at import time
+    os.environ.update(CACHE_DIR=str(tmp_path_factory.mktemp("cache")), CACHE_MAX_MB="64", SHARED_CACHE_PREFIX="")
+    if s3_endpoint:
+        os.environ.update(
+            S3_ENDPOINT_URL=s3_endpoint, S3_BUCKET=BUCKET, AWS_REGION="us-east-1",
+            AWS_ACCESS_KEY_ID="test", AWS_SECRET_ACCESS_KEY="test", SHARED_CACHE_PREFIX="cache",
+        )
+    from microservice.app import app, s3_client
+
+    if s3_endpoint:
+        s3_client.create_bucket(Bucket=BUCKET)
+    with fastapi_testclient.TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def s3(client, s3_endpoint):
+    if not s3_endpoint:
+        pytest.skip("moto is not installed")
+    from microservice.app import s3_client
+
+    return s3_client
+
+
+def _convert(client, data: bytes, target_version: str, filename: str = "model.3dm"):
+    return client.post("/convert", files={"file": (filename, data)}, data={"targetVersion": target_version})
+
+
+def test_convert_is_cached(client, model_bytes):
+    first = _convert(client, model_bytes, "5")
+    assert first.status_code == 200, first.text
+    assert first.headers["X-Conversion-Cache"] == "MISS"
+
+    again = _convert(client, model_bytes, "5", "renamed.3dm")
+    assert again.headers["X-Conversion-Cache"] == "HIT"
+    assert again.content == first.content
+
+    other = _convert(client, model_bytes, "6")
+    assert other.headers["X-Conversion-Cache"] == "MISS"
+    assert client.get("/cache/stats").json()["entries"] >= 2
+
+
+def test_current_file_is_returned_unchanged(client, model_bytes):
+    v5 = _convert(client, model_bytes, "5").content
+
+    r = _convert(client, v5, "7")
+    assert r.status_code == 200, r.text
+    assert r.headers["X-Conversion-Cache"] == "BYPASS"
+    assert r.headers["X-Source-Version"] == "5"
+    assert r.content == v5
+
+
+def test_upload_name_cannot_leave_temp_dir(client, model_bytes):
+    name = f"escaped_{uuid.uuid4().hex}"
+    # Several versions make /convert write the upload to disk
+    r = client.post("/convert", files={"file": (f"../{name}.3dm", model_bytes)}, data={"targetVersion": "5,6"})
+
+    assert r.status_code == 200, r.text
+    assert not (Path(tempfile.gettempdir()) / f"{name}.3dm").exists()
+    with zipfile.ZipFile(io.BytesIO(r.content)) as archive:
+        assert sorted(archive.namelist()) == [f"{name}_v5.3dm", f"{name}_v6.3dm"]
+
+
+@pytest.mark.parametrize("filename", ['say "hi"_v5.3dm', "modèle_v5.3dm"])
+def test_s3_output_disposition_is_encoded(client, filename):
+    from microservice.app import _output_args
+
+    disposition = _output_args(filename)["ContentDisposition"]
+    assert disposition.isascii()
+    assert disposition.startswith("attachment; filename*=utf-8''")
+    assert '"' not in disposition
+
+
+def _wait_for_shared_stores(client, count: int):
+    deadline = time.monotonic() + 10
+    while client.get("/cache/stats").json()["shared"]["stores"] < count:
+        assert time.monotonic() < deadline, "shared cache store did not finish"
+        time.sleep(0.05)
+
+
+def test_by_key_copies_shared_cache_hit(client, s3, model_bytes):
+    # Distinct content so earlier tests' cache entries don't count
+    data = model_bytes + b"\0"
+    stores = client.get("/cache/stats").json()["shared"]["stores"]
+    s3.put_object(Bucket=BUCKET, Key="u/first.3dm", Body=data)
+    r = client.post("/convert-by-key", data={"key": "u/first.3dm", "targetVersion": "5"})
+    assert r.status_code == 200, r.text
+    assert r.headers["X-Conversion-Cache"] == "MISS"
+    _wait_for_shared_stores(client, stores + 1)
+
+    # Uploaded without a checksum, as /presign does: the input is hashed, the output copied
+    s3.put_object(Bucket=BUCKET, Key="u/second.3dm", Body=data)
+    r = client.post("/convert-by-key", data={"key": "u/second.3dm", "targetVersion": "5", "delivery": "s3"})
+    assert r.status_code == 200, r.text
+    assert r.headers["X-Conversion-Cache"] == "HIT"
+    result = r.json()
+    assert "hash" in result["timings"] and "upload" not in result["timings"]
+    copied = s3.get_object(Bucket=BUCKET, Key=result["key"])["Body"].read()
+    assert conv.probe_bytes(copied)["version"] == 5
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from microservice.cache import ConversionCache, cache_key
+
+
+def _key(n: int) -> str:
+    return cache_key(f"{n:064x}", 5, "8.0.0")
+
+
+def test_cache_key_depends_on_every_part():
+    keys = {
+        cache_key("a" * 64, 5, "8.0.0"),
+        cache_key("b" * 64, 5, "8.0.0"),
+        cache_key("a" * 64, 6, "8.0.0"),
+        cache_key("a" * 64, 5, "8.1.0"),
+    }
+    assert len(keys) == 4
+
+
+def test_put_get_round_trip(tmp_path, model_path, model_bytes):
+    cache = ConversionCache(tmp_path / "cache", 10 * len(model_bytes))
+    cache.put(_key(1), model_path)
+
+    dest = tmp_path / "out.3dm"
+    assert cache.get(_key(1), dest)
+    assert dest.read_bytes() == model_bytes
+    assert cache.read(_key(1)) == model_bytes
+    assert not cache.get(_key(2), tmp_path / "missing.3dm")
+    assert cache.read(_key(2)) is None
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(model_bytes)
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ConversionCache(tmp_path, 300)
+    for n in range(3):
+        cache.put_bytes(_key(n), bytes([n]) * 100)
+    # Touch the oldest entry so the second one is evicted instead
+    assert cache.read(_key(0)) is not None
+    cache.put_bytes(_key(3), b"x" * 100)
+
+    assert cache.read(_key(1)) is None
+    assert all(cache.read(_key(n)) is not None for n in (0, 2, 3))
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 300
+    assert not cache._path(_key(1)).exists()
+
+
+def test_size_accounting(tmp_path):
+    cache = ConversionCache(tmp_path, 250)
+    cache.put_bytes(_key(0), b"a" * 100)
+    cache.put_bytes(_key(0), b"a" * 100)
+    assert cache.stats()["bytes"] == 100
+
+    # Larger than the whole cache: not stored, nothing evicted
+    cache.put_bytes(_key(1), b"b" * 251)
+    assert cache.stats() | {"hits": 0, "misses": 0} == {
+        "enabled": True, "entries": 1, "bytes": 100, "maxBytes": 250, "hits": 0, "misses": 0, "evictions": 0,
+    }
+
+    cache.put_bytes(_key(2), b"c" * 200)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+def test_entry_removed_from_disk_is_a_miss(tmp_path):
+    cache = ConversionCache(tmp_path, 1000)
+    cache.put_bytes(_key(0), b"a" * 100)
+    cache._path(_key(0)).unlink()
+
+    assert not cache.get(_key(0), tmp_path / "out.3dm")
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_reload_keeps_entries_and_bound(tmp_path):
+    cache = ConversionCache(tmp_path, 1000)
+    for n in range(3):
+        cache.put_bytes(_key(n), b"a" * 100)
+
+    reloaded = ConversionCache(tmp_path, 1000)
+    assert reloaded.stats()["entries"] == 3
+    assert reloaded.stats()["bytes"] == 300
+
+    shrunk = ConversionCache(tmp_path, 200)
+    assert shrunk.stats()["entries"] == 2
+    assert shrunk.stats()["bytes"] == 200
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ConversionCache(tmp_path / "cache", 0)
+    cache.put_bytes(_key(0), b"a")
+
+    assert not cache.enabled
+    assert cache.read(_key(0)) is None
+    assert not (tmp_path / "cache").exists()
+    assert cache.stats()["misses"] == 0
+
+
+def test_concurrent_use_keeps_accounting(tmp_path):
+    cache = ConversionCache(tmp_path, 2000)
+
+    def work(n):
+        cache.put_bytes(_key(n % 40), bytes([n % 40]) * 100)
+        cache.read(_key((n * 7) % 40))
+        cache.get(_key((n * 3) % 40), tmp_path / f"out-{n}.3dm")
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(work, range(400)))
+
+    on_disk = sum(path.stat().st_size for path in tmp_path.glob("*/*.3dm"))
+    assert cache.stats()["bytes"] == on_disk <= 2000
+    assert not list(tmp_path.glob("*/*.tmp"))
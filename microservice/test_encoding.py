@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+
+from microservice.encoding import (
+    DecodedTooLarge,
+    DecodeError,
+    StreamDecoder,
+    compress_bytes,
+    compress_file,
+    decode_file,
+    negotiate_encoding,
+    sniff_encoding,
+    supported_encodings,
+)
+
+ENCODINGS = supported_encodings()
+
+
+def _decode(encoding: str, data: bytes, chunk_size: int = 1024 * 1024, feed: int = 64 * 1024) -> list[bytes]:
+    decoder = StreamDecoder(encoding, chunk_size)
+    out = []
+    for offset in range(0, len(data), feed):
+        out.extend(decoder.decode(data[offset:offset + feed]))
+    decoder.finish()
+    return out
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_round_trip(encoding, model_bytes):
+    compressed = compress_bytes(model_bytes, encoding)
+    assert sniff_encoding(compressed) == encoding
+    assert b"".join(_decode(encoding, compressed)) == model_bytes
+
+
+def test_gzip_chunks_are_bounded():
+    compressed = gzip.compress(b"\0" * (8 * 1024 * 1024))
+    chunks = _decode("gzip", compressed, chunk_size=64 * 1024, feed=len(compressed))
+
+    assert max(len(chunk) for chunk in chunks) <= 64 * 1024
+    assert sum(len(chunk) for chunk in chunks) == 8 * 1024 * 1024
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_concatenated_streams(encoding, model_bytes):
+    compressed = compress_bytes(model_bytes, encoding) + compress_bytes(b"tail", encoding)
+    assert b"".join(_decode(encoding, compressed, feed=1000)) == model_bytes + b"tail"
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_truncated_stream(encoding, model_bytes):
+    compressed = compress_bytes(model_bytes, encoding)
+    with pytest.raises(DecodeError, match="Truncated"):
+        _decode(encoding, compressed[: len(compressed) // 2])
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_corrupt_stream(encoding):
+    compressed = compress_bytes(b"model" * 1000, encoding)
+    corrupt = compressed[:10] + bytes(b ^ 0xFF for b in compressed[10:])
+    with pytest.raises(DecodeError):
+        _decode(encoding, corrupt)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_decode_file_limit(encoding, tmp_path):
+    # 64 MB of zeros compresses to a few KB
+    src = tmp_path / "bomb"
+    src.write_bytes(compress_bytes(b"\0" * (64 * 1024 * 1024), encoding))
+    dest = tmp_path / "out"
+
+    with pytest.raises(DecodedTooLarge):
+        decode_file(src, dest, encoding, max_bytes=4 * 1024 * 1024)
+    # Stopped close to the limit rather than after inflating everything
+    assert dest.stat().st_size < 64 * 1024 * 1024
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_decode_file_within_limit(encoding, tmp_path, model_path, model_bytes):
+    src = compress_file(model_path, encoding)
+    dest = tmp_path / "model.3dm"
+
+    assert decode_file(src, dest, encoding, max_bytes=len(model_bytes)) == len(model_bytes)
+    assert dest.read_bytes() == model_bytes
+
+
+def test_unsupported_encoding():
+    with pytest.raises(DecodeError):
+        StreamDecoder("br")
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip, br") == "gzip"
+    assert negotiate_encoding("*") == ENCODINGS[0]
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from microservice.singleflight import SingleFlight
+
+
+class _Conversion:
+    """Stand-in conversion that blocks until released."""
+
+    def __init__(self, result="output", error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_followers_share_the_result():
+    async def main():
+        flights = SingleFlight()
+        conversion = _Conversion()
+        leader = asyncio.create_task(flights.do("key", conversion))
+        await conversion.started.wait()
+        followers = [asyncio.create_task(flights.do("key", conversion)) for _ in range(3)]
+        await asyncio.sleep(0)
+        conversion.release.set()
+        return conversion.calls, await leader, await asyncio.gather(*followers), flights.in_flight
+
+    calls, leader, followers, in_flight = asyncio.run(main())
+    assert calls == 1
+    assert leader == ("output", False)
+    assert followers == [("output", True)] * 3
+    assert in_flight == 0
+
+
+def test_leader_failure_reaches_followers():
+    async def main():
+        flights = SingleFlight()
+        conversion = _Conversion(error=ValueError("corrupt model"))
+        leader = asyncio.create_task(flights.do("key", conversion))
+        await conversion.started.wait()
+        follower = asyncio.create_task(flights.do("key", conversion))
+        await asyncio.sleep(0)
+        conversion.release.set()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return conversion.calls, results, flights.in_flight
+
+    calls, results, in_flight = asyncio.run(main())
+    assert calls == 1
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert in_flight == 0
+
+
+def test_cancelled_leader_hands_over():
+    async def main():
+        flights = SingleFlight()
+        first = _Conversion(result="first")
+        leader = asyncio.create_task(flights.do("key", first))
+        await first.started.wait()
+
+        second = _Conversion(result="second")
+        follower = asyncio.create_task(flights.do("key", second))
+        await asyncio.sleep(0)
+        leader.cancel()
+        # The follower converts on its own once the leader is gone
+        await second.started.wait()
+        second.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, second.calls, flights.in_flight
+
+    result, calls, in_flight = asyncio.run(main())
+    assert result == ("second", False)
+    assert calls == 1
+    assert in_flight == 0
+
+
+def test_cancelled_follower_leaves_leader_running():
+    async def main():
+        flights = SingleFlight()
+        conversion = _Conversion()
+        leader = asyncio.create_task(flights.do("key", conversion))
+        await conversion.started.wait()
+        follower = asyncio.create_task(flights.do("key", conversion))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        conversion.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == ("output", False)
+
+
+def test_disabled_runs_every_caller():
+    async def main():
+        flights = SingleFlight(enabled=False)
+        conversion = _Conversion()
+        tasks = [asyncio.create_task(flights.do("key", conversion)) for _ in range(3)]
+        await conversion.started.wait()
+        assert flights.follow("key") is None
+        conversion.release.set()
+        return await asyncio.gather(*tasks), conversion.calls
+
+    results, calls = asyncio.run(main())
+    assert results == [("output", False)] * 3
+    assert calls == 3
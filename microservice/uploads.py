@@ -0,0 +1,163 @@
+"""
+Resumable chunked uploads for the converter service.
+
+A client announces a file and its size, then PUTs it in fixed-size chunks,
+in any order and several at a time. Every chunk is streamed straight to its
+offset in a sparse file, so nothing is held in memory, and a dropped
+connection only costs the chunks that were in flight: the client asks which
+chunks are still missing and sends just those. Once every chunk is in, the
+upload is handed over for conversion. Uploads untouched for ``ttl`` seconds
+are deleted.
+"""
+import asyncio
+import hashlib
+import math
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+
+class UploadLimitReached(Exception):
+    """Raised when too many uploads are in progress."""
+
+
+class ChunkError(ValueError):
+    """Raised for a chunk that does not fit its upload or does not match its checksum."""
+
+
+class ChunkedUpload:
+    def __init__(self, directory: Path, filename: str, size: int, chunk_size: int):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunks = math.ceil(size / chunk_size)
+        self.received: set[int] = set()
+        self.in_flight = 0
+        self.dir = directory / self.id
+        self.path = self.dir / filename
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def missing(self) -> list[int]:
+        return [index for index in range(self.chunks) if index not in self.received]
+
+    @property
+    def complete(self) -> bool:
+        return len(self.received) == self.chunks
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def to_dict(self) -> dict:
+        return {
+            "uploadId": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "chunkSize": self.chunk_size,
+            "chunks": self.chunks,
+            "received": len(self.received),
+            "missing": self.missing,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+        }
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class UploadManager:
+    """In-progress :class:`ChunkedUpload` objects, each in its own directory under ``directory``.
+
+    State lives in memory, so chunks of one upload must reach the same process.
+    """
+
+    def __init__(self, directory: Path, ttl: int = 86400, max_active: int = 100):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_active = max_active
+        self._uploads: dict[str, ChunkedUpload] = {}
+        self._reaper_task: asyncio.Task | None = None
+
+    async def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._reaper_task = asyncio.create_task(self._reaper())
+
+    async def stop(self):
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            await asyncio.gather(self._reaper_task, return_exceptions=True)
+            self._reaper_task = None
+        for upload in self._uploads.values():
+            upload.cleanup()
+        self._uploads.clear()
+
+    @property
+    def active(self) -> int:
+        return len(self._uploads)
+
+    def create(self, filename: str, size: int, chunk_size: int) -> ChunkedUpload:
+        if self.active >= self.max_active:
+            raise UploadLimitReached()
+        upload = ChunkedUpload(self.directory, filename, size, chunk_size)
+        upload.dir.mkdir(parents=True)
+        # Sized up front without writing anything: chunks fill the holes
+        with upload.path.open("wb") as f:
+            f.truncate(size)
+        self._uploads[upload.id] = upload
+        return upload
+
+    def get(self, upload_id: str) -> ChunkedUpload | None:
+        return self._uploads.get(upload_id)
+
+    def take(self, upload: ChunkedUpload) -> ChunkedUpload:
+        """Stop tracking ``upload``; the caller now owns its directory."""
+        self._uploads.pop(upload.id, None)
+        return upload
+
+    def discard(self, upload: ChunkedUpload):
+        self.take(upload).cleanup()
+
+    async def write_chunk(self, upload: ChunkedUpload, index: int, body: AsyncIterator[bytes], sha256: str | None = None):
+        """Stream chunk ``index`` from ``body`` into place.
+
+        The chunk only counts as received once its length, and its SHA-256 if
+        ``sha256`` (hex) is given, check out; otherwise :class:`ChunkError`
+        is raised and the client sends it again.
+        """
+        if not 0 <= index < upload.chunks:
+            raise ChunkError(f"Chunk index {index} out of range, the upload has {upload.chunks} chunks")
+        expected = upload.chunk_length(index)
+        digest = hashlib.sha256()
+        written = 0
+        # A resent chunk overwrites the old copy, so it is missing until it checks out
+        upload.received.discard(index)
+        upload.in_flight += 1
+        try:
+            with upload.path.open("r+b") as f:
+                f.seek(index * upload.chunk_size)
+                async for data in body:
+                    written += len(data)
+                    if written > expected:
+                        raise ChunkError(f"Chunk {index} is longer than {expected} bytes")
+                    digest.update(data)
+                    await asyncio.to_thread(f.write, data)
+        finally:
+            upload.in_flight -= 1
+            upload.updated_at = time.time()
+        if written != expected:
+            raise ChunkError(f"Chunk {index} has {written} bytes, expected {expected}")
+        if sha256 and digest.hexdigest() != sha256.strip().lower():
+            raise ChunkError(f"Chunk {index} does not match its SHA-256")
+        upload.received.add(index)
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(min(60, self.ttl))
+            cutoff = time.time() - self.ttl
+            for upload in list(self._uploads.values()):
+                if upload.updated_at < cutoff and not upload.in_flight:
+                    self.discard(upload)
@@ -47,6 +47,9 @@ export async function POST(request: NextRequest) {
 
     // Stream the upstream response back to the client
     const headers = new Headers(upstream.headers);
+    // fetch has already decoded the body, so these no longer describe it
+    headers.delete('content-encoding');
+    headers.delete('content-length');
     // Ensure no caching and pass through content-disposition for download filename
     headers.set('Cache-Control', 'no-store');
     return new NextResponse(upstream.body as ReadableStream<Uint8Array> | null, {